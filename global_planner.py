@@ -7,7 +7,7 @@ from voyager.agents.skill import SkillManager
 from voyager.prompts import load_prompt
 
 class GlobalPlanner:
-    def __init__(self, ckpt_dir):
+    def __init__(self, ckpt_dir, embedding_model="openai"):
         """
         Global Planner: Takımın beyni.
         """
@@ -20,7 +20,9 @@ class GlobalPlanner:
         self.skill_manager = SkillManager(
             ckpt_dir=self.ckpt_dir,
             resume=True,          # ÖNEMLİ: Var olan yetenekleri okumak için
-            retrieval_top_k=0     # Planner retrieval yapmayacağı için 0
+            retrieval_top_k=0,    # Planner retrieval yapmayacağı için 0
+            embedding_model=embedding_model,
+            embedding_cache_path=f"{self.ckpt_dir}/embedding_cache.sqlite3",
         )
         
         # DÜZELTME 1: Skill Index zaten metin (String) olarak gelmeli.
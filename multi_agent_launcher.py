@@ -1,4 +1,6 @@
+import asyncio
 import multiprocessing
+import sys
 import time
 import queue
 from voyager import Voyager
@@ -11,27 +13,79 @@ def update_proxy(st, d):
         st[k] = v
 
 def put_latest(q, payload, agent_name, drop_all=True):
+    # works for both multiprocessing.Queue and asyncio.Queue
     try:
         q.put_nowait(payload)
         return True
-    except queue.Full:
+    except (queue.Full, asyncio.QueueFull):
         try:
             if drop_all:
                 while True:
                     q.get_nowait()
             else:
                 q.get_nowait()
-        except queue.Empty:
+        except (queue.Empty, asyncio.QueueEmpty):
             pass
 
         try:
             q.put_nowait(payload)
             print(f"🔁 [GlobalPlanner] {agent_name} queue overwrite -> latest task set.", flush=True)
             return True
-        except queue.Full:
+        except (queue.Full, asyncio.QueueFull):
             print(f"⚠️ [GlobalPlanner] {agent_name} overwrite failed (still full).", flush=True)
             return False
 
+def summarize_team(current_team_snapshot):
+    team_status_report = {}
+    total_inventory = {}
+
+    for name, state in current_team_snapshot.items():
+        if isinstance(state, dict): # Sometimes error messages can come as strings, check
+            print(f"👀[GlobalPlanner] [{name}] Fetching Current Status...", flush=True)
+            team_status_report[name] = state.get("status", "Unknown")
+            print(f"👀[GlobalPlanner] [{name}] Current Status Retrieved: {state.get('status')}", flush=True)
+
+            # Inventory merging
+            inv = state.get("inventory", {})
+            if isinstance(inv, dict):
+                for item, count in inv.items():
+                    total_inventory[item] = total_inventory.get(item, 0) + count
+
+    # DEBUG
+    if team_status_report:
+        print(f"\n👀 Current Status: {team_status_report}")
+    return team_status_report, total_inventory
+
+def dispatch_plan(plan, current_team_snapshot, team_status_report, task_queues, shared_team_state):
+    print(f"📜 [GlobalPlanner] Strategy: {plan.get('thought', '...')}")
+    assignments = plan.get("assignments", {})
+    for agent_name, assignment_data in assignments.items():
+        if isinstance(assignment_data, dict):
+            task = assignment_data.get("task")
+            purpose = assignment_data.get("purpose", "")
+        else:
+            task = assignment_data
+            purpose = ""
+
+        if task and task not in ["wait", "continue"]:
+            if agent_name in task_queues:
+                print(f"[GlobalPlanner] outgoing -> {agent_name}: {task}")
+                if team_status_report.get(agent_name) != "Idle":
+                    continue
+                agent_state = current_team_snapshot.get(agent_name, {})
+                if agent_state.get("status") != "Idle":
+                    continue
+                if agent_state.get("has_pending_task", False):
+                    continue
+
+                success = put_latest(task_queues[agent_name], {"task": task, "purpose": purpose}, agent_name, drop_all=False)
+                if success:
+                    st = shared_team_state[agent_name]
+                    st["has_pending_task"] = True
+                    st["pending_task"] = task
+                    if st.get("status") in ["Idle", "Unknown"]:
+                        st["status"] = "Pending"
+
 def recover(bot, st, err):
     st["status"] = "Idle"
     st["has_pending_task"] = False
@@ -67,6 +121,7 @@ def run_single_agent(agent_config, task_queue, shared_team_state):
             resume=True,
             ckpt_dir="ckpt",
             env_request_timeout=120,
+            skill_retrieval_address=agent_config.get("skill_retrieval_address"),
             openai_api_key="", # API KEY
         )
         if bot is None:
@@ -172,6 +227,131 @@ def run_single_agent(agent_config, task_queue, shared_team_state):
         print(f"❌ [{name}] Fatal error: {e}", flush=True)
         return
 
+async def arecover(bot, st, err):
+    st["status"] = "Idle"
+    st["has_pending_task"] = False
+    st["pending_task"] = None
+    st["last_success"] = False
+    st["last_critique"] = f"Recovered from error: {err}"
+
+    try:
+        await bot.env.reset(options={"mode": "soft", "wait_ticks": 40})
+        bot.current_status = "Idle"
+        try:
+            update_proxy(st, await bot.aget_agent_state())
+        except Exception:
+            pass
+        st["status"] = "Idle"
+        return True
+    except Exception:
+        return False
+
+async def run_single_agent_async(agent_config, task_queue, team_state):
+    """
+    Same loop as run_single_agent, but as a coroutine: every agent runs on one event loop
+    in the launcher process instead of holding its own OS process.
+    """
+    name = agent_config["name"]
+    st = team_state[name]
+    print(f"🚀 [TASK IS STARTED] Agent: {name} (Bridge: {agent_config['bridge_port']})", flush=True)
+    try:
+        bot = await asyncio.to_thread(
+            Voyager,
+            mc_port=agent_config["mc_port"],
+            bot_name=name,
+            server_port=agent_config["bridge_port"],
+            resume=True,
+            ckpt_dir="ckpt",
+            env_request_timeout=120,
+            env_async=True,
+            skill_retrieval_address=agent_config.get("skill_retrieval_address"),
+            openai_api_key="", # API KEY
+        )
+        print(f"🔌 [{name}] Connecting ...", flush=True)
+        initial_data = await bot.env.reset(options={"mode": "soft", "wait_ticks": 40})
+        bot.last_events = [("observe", initial_data)]
+        print(f"✅ [{name}] CONNECTION SUCCESSFUL!", flush=True)
+    except Exception as e:
+        st["status"] = "Dead"
+        st["last_success"] = False
+        st["last_critique"] = f"Fatal before loop: {e}"
+        print(f"❌ [{name}] Fatal error: {e}", flush=True)
+        return
+    bot.current_status = "Idle"
+    st["status"] = "Idle"
+    print(f"🤖 [{name}] Ready. Loop Starting...", flush=True)
+
+    while True:
+        try:
+            update_proxy(st, await bot.aget_agent_state())
+            if st.get("has_pending_task", False) and bot.current_status == "Idle":
+                st["status"] = "Pending"
+            else:
+                st["status"] = bot.current_status
+            task_data = await asyncio.wait_for(task_queue.get(), timeout=2)
+            print(f"📥 [{name}] New Task Received: {task_data}", flush=True)
+            if isinstance(task_data, dict):
+                task = task_data.get("task")
+                purpose = task_data.get("purpose", "")
+            else:
+                task = task_data
+                purpose = ""
+            st["has_pending_task"] = False
+            st["pending_task"] = None
+            if not task or task in ["wait", "continue"]:
+                continue
+            bot.current_status = "Working"
+            update_proxy(st, await bot.aget_agent_state())
+            st["status"] = "Working"
+            try:
+                await bot.arollout(task=task, context=f"Order: {purpose}", reset_env=True)
+            except Exception as e:
+                st["last_success"] = False
+                st["last_critique"] = f"Rollout error: {str(e)}"
+            bot.current_status = "Idle"
+            update_proxy(st, await bot.aget_agent_state())
+            st["status"] = "Idle"
+        except asyncio.TimeoutError:
+            continue
+        except Exception as e:
+            print(f"❌ [{name}] Loop Error: {e} (Recovering...)", flush=True)
+            if not await arecover(bot, st, e):
+                st["status"] = "Dead"
+                st["last_critique"] = f"Recover failed: {e}"
+                print(f"💀 [{name}] Recover failed -> agent exiting.", flush=True)
+                break
+
+async def main_async(main_goal, agents_data):
+    team_state = {
+        data["name"]: {"status": "Unknown", "has_pending_task": False, "pending_task": None}
+        for data in agents_data
+    }
+    task_queues = {data["name"]: asyncio.Queue(maxsize=1) for data in agents_data}
+    planner = await asyncio.to_thread(GlobalPlanner, ckpt_dir="ckpt")
+    agent_tasks = []
+    for data in agents_data:
+        agent_tasks.append(
+            asyncio.create_task(run_single_agent_async(data, task_queues[data["name"]], team_state))
+        )
+        print(f"⏳[GlobalPlanner] {data['name']} started. Waiting 15 seconds for others...")
+        await asyncio.sleep(15)
+    print("🌍 [GlobalPlanner] Global Planner is active (asyncio). Monitoring team state...")
+    while any(not t.done() for t in agent_tasks):
+        current_team_snapshot = {k: dict(v) for k, v in team_state.items()}
+        team_status_report, total_inventory = summarize_team(current_team_snapshot)
+        idle_agents = [n for n, s in team_status_report.items() if s == "Idle"]
+        if idle_agents and len(team_status_report) == len(agents_data):
+            print(f"🧠[GlobalPlanner] Planning... (Idle: {idle_agents})")
+            plan = await asyncio.to_thread(
+                planner.create_plan,
+                main_goal=main_goal,
+                agents_status=team_status_report,
+                shared_inventory=total_inventory,
+            )
+            dispatch_plan(plan, current_team_snapshot, team_status_report, task_queues, team_state)
+        await asyncio.sleep(5)
+
+
 if __name__ == '__main__':
     
     try:
@@ -186,6 +366,12 @@ if __name__ == '__main__':
         {"name": "Voyager_Miner", "mc_port": 43781, "bridge_port": 3000},
         {"name": "Voyager_Crafter", "mc_port": 43781, "bridge_port": 3001}
     ]
+    # share one skill index per host: start `python -m voyager.retrieval.service --address localhost:6000`
+    # and set "skill_retrieval_address": "localhost:6000" on every agent
+    if "--async" in sys.argv:
+        # one process, all agents on a single event loop
+        asyncio.run(main_async(MAIN_GOAL, agents_data))
+        sys.exit(0)
     manager = multiprocessing.Manager()
     shared_team_state = manager.dict() 
 
@@ -212,24 +398,7 @@ if __name__ == '__main__':
 
     while True:
         current_team_snapshot = {k: dict(v) for k, v in shared_team_state.items()}
-        team_status_report = {}
-        total_inventory = {}
-        
-        for name, state in current_team_snapshot.items():
-            if isinstance(state, dict): # Sometimes error messages can come as strings, check
-                print(f"👀[GlobalPlanner] [{name}] Fetching Current Status...", flush=True)
-                team_status_report[name] = state.get("status", "Unknown")
-                print(f"👀[GlobalPlanner] [{name}] Current Status Retrieved: {state.get('status')}", flush=True)
-
-                # Inventory merging
-                inv = state.get("inventory", {})
-                if isinstance(inv, dict):
-                    for item, count in inv.items():
-                        total_inventory[item] = total_inventory.get(item, 0) + count
-
-        # DEBUG
-        if team_status_report:
-            print(f"\n👀 Current Status: {team_status_report}")
+        team_status_report, total_inventory = summarize_team(current_team_snapshot)
 
         # B. PLANLAMA (THINK & ACT)
         idle_agents = [n for n, s in team_status_report.items() if s == "Idle"]
@@ -241,33 +410,6 @@ if __name__ == '__main__':
                 agents_status=team_status_report,
                 shared_inventory=total_inventory
             )
-            print(f"📜 [GlobalPlanner] Strategy: {plan.get('thought', '...')}")
-            assignments = plan.get("assignments", {})
-            for agent_name, assignment_data in assignments.items():
-                if isinstance(assignment_data, dict):
-                    task = assignment_data.get("task")
-                    purpose = assignment_data.get("purpose", "")
-                else:
-                    task = assignment_data
-                    purpose = ""
-
-                if task and task not in ["wait", "continue"]:
-                    if agent_name in task_queues:
-                        print(f"[GlobalPlanner] outgoing -> {agent_name}: {task}")
-                        if team_status_report.get(agent_name) != "Idle":
-                            continue
-                        agent_state = current_team_snapshot.get(agent_name, {})
-                        if agent_state.get("status") != "Idle":
-                            continue
-                        if agent_state.get("has_pending_task", False):
-                            continue
-
-                        success = put_latest(task_queues[agent_name], {"task": task, "purpose": purpose}, agent_name, drop_all=False)
-                        if success:
-                            st = shared_team_state[agent_name]
-                            st["has_pending_task"] = True
-                            st["pending_task"] = task
-                            if st.get("status") in ["Idle", "Unknown"]:
-                                st["status"] = "Pending"
+            dispatch_plan(plan, current_team_snapshot, team_status_report, task_queues, shared_team_state)
         time.sleep(5)
         print("\n-----------------------------\n")
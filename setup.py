@@ -6,7 +6,10 @@ from setuptools import setup, find_packages
 
 PKG_NAME = "voyager"
 VERSION = "0.1"
-EXTRAS = {}
+EXTRAS = {
+    # compact observations from mineflayer
+    "msgpack": ["msgpack"],
+}
 
 
 def _read_file(fname):
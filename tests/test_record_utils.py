@@ -0,0 +1,68 @@
+import os
+
+import voyager.utils as U
+from voyager.utils.record_utils import EventRecorder
+
+
+def make_events(x, items, elapsed_time=10):
+    event = {
+        "inventory": {item: 1 for item in items},
+        "status": {
+            "position": {"x": x, "y": 64, "z": 0},
+            "biome": "plains",
+            "elapsedTime": elapsed_time,
+        },
+    }
+    return [["observe", event]]
+
+
+def write_legacy_checkpoint(ckpt_dir):
+    # event files only, as written before the index existed, one second apart so they sort by name
+    iterations = [
+        (0, ["oak_log"]),
+        (5, ["oak_log", "oak_planks"]),
+        (9, ["oak_log", "oak_planks", "stick"]),
+    ]
+    U.f_mkdir(ckpt_dir, "events")
+    for i, (x, items) in enumerate(iterations):
+        U.dump_json(
+            make_events(x, items),
+            U.f_join(ckpt_dir, "events", f"task_20240101_00000{i}"),
+        )
+
+
+def test_resume_legacy_checkpoint(tmp_path):
+    ckpt_dir = str(tmp_path)
+    write_legacy_checkpoint(ckpt_dir)
+    recorder = EventRecorder(ckpt_dir=ckpt_dir, resume=True)
+    assert recorder.iteration == 3
+    assert recorder.item_history == {"oak_log", "oak_planks", "stick"}
+    assert recorder.elapsed_time == 30
+    assert os.path.exists(recorder.index_path)
+
+
+def test_resume_legacy_checkpoint_with_cutoff(tmp_path):
+    ckpt_dir = str(tmp_path)
+    write_legacy_checkpoint(ckpt_dir)
+    recorder = EventRecorder(ckpt_dir=ckpt_dir)
+    # resume=False drops the index, the checkpoint is legacy again
+    write_legacy_checkpoint(ckpt_dir)
+    recorder.resume(cutoff=1)
+    assert recorder.iteration == 1
+    assert recorder.item_history == {"oak_log"}
+    assert recorder.item_vs_iter == {1: ["oak_log"]}
+    assert recorder.elapsed_time == 10
+    assert recorder.position_history == [[0, 0]]
+
+
+def test_resume_cutoff_after_summary(tmp_path):
+    ckpt_dir = str(tmp_path)
+    write_legacy_checkpoint(ckpt_dir)
+    EventRecorder(ckpt_dir=ckpt_dir, resume=True)
+    recorder = EventRecorder(ckpt_dir=ckpt_dir, resume=False)
+    write_legacy_checkpoint(ckpt_dir)
+    recorder.resume()
+    recorder.resume(cutoff=2)
+    assert recorder.iteration == 2
+    assert recorder.item_history == {"oak_log", "oak_planks"}
+    assert recorder.position_history == [[0, 0], [5, 0]]
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+from langchain.schema import AIMessage, HumanMessage
+
+from voyager.llm import RetryExecutor, LLMParseError
+from voyager.llm.retry import get_circuit_breaker
+from voyager.voyager import Voyager
+
+
+class FakeLLM:
+    def __init__(self, model_name, content="not parsable"):
+        self.model_name = model_name
+        self.content = content
+        self.calls = 0
+
+    def __call__(self, messages):
+        self.calls += 1
+        return AIMessage(content=self.content)
+
+
+def fail_parse(content):
+    raise ValueError("bad format")
+
+
+def test_zero_max_retries_makes_a_single_attempt():
+    llm = FakeLLM("test-zero-retries")
+    executor = RetryExecutor("Test", max_retries=5)
+    with pytest.raises(LLMParseError):
+        executor.run(llm, [HumanMessage(content="hi")], parse=fail_parse, max_retries=0)
+    assert llm.calls == 1
+
+
+def test_default_max_retries():
+    llm = FakeLLM("test-default-retries")
+    executor = RetryExecutor("Test", max_retries=3)
+    with pytest.raises(LLMParseError):
+        executor.run(llm, [HumanMessage(content="hi")], parse=fail_parse)
+    assert llm.calls == 3
+
+
+class FakeRecorder:
+    def __init__(self):
+        self.records = []
+
+    def record(self, events, task):
+        self.records.append((events, task))
+
+
+class FakeActionAgent:
+    def __init__(self, llm):
+        self.llm = llm
+        self.retry_executor = RetryExecutor("Action Agent")
+
+
+def test_open_circuit_fails_the_iteration():
+    llm = FakeLLM("test-open-circuit")
+    get_circuit_breaker(llm.model_name).opened_at = time.time()
+    voyager = Voyager.__new__(Voyager)
+    voyager.action_agent = FakeActionAgent(llm)
+    voyager.recorder = FakeRecorder()
+    voyager.messages = [HumanMessage(content="system"), HumanMessage(content="human")]
+    voyager.action_agent_rollout_num_iter = 0
+    voyager.action_agent_task_max_retries = 4
+    voyager.task = "Mine 1 wood log"
+    voyager.conversations = []
+    messages, reward, done, info = voyager.step()
+    assert llm.calls == 0
+    assert not info["success"]
+    assert not done
+    assert voyager.action_agent_rollout_num_iter == 1
+    assert voyager.recorder.records == [([], "Mine 1 wood log")]
@@ -0,0 +1,59 @@
+from voyager.agents.task_rules import check_task_rules
+
+
+def make_events(inventory, errors=()):
+    events = [["onError", {"onError": error, "inventory": inventory}] for error in errors]
+    events.append(["observe", {"inventory": inventory}])
+    return events
+
+
+def test_recognized_item_success():
+    assert check_task_rules("Mine 1 wood log", make_events({"oak_log": 1})) == (True, "")
+    assert check_task_rules("Mine 2 iron ore", make_events({"raw_iron": 2})) == (True, "")
+
+
+def test_error_without_inventory_change_fails():
+    inventory = {"oak_log": 1}
+    success, critique = check_task_rules(
+        "Mine 1 coal ore",
+        make_events(inventory, errors=["No coal_ore nearby, could not find it"]),
+        initial_inventory=dict(inventory),
+    )
+    assert not success
+    assert "Exploration failed" in critique
+
+
+def test_error_or_unchanged_inventory_alone_defers_to_llm():
+    inventory = {"oak_log": 1}
+    assert (
+        check_task_rules(
+            "Mine 1 coal ore",
+            make_events({"oak_log": 2}, errors=["Took too long"]),
+            initial_inventory=inventory,
+        )
+        is None
+    )
+    assert (
+        check_task_rules(
+            "Mine 1 coal ore", make_events(inventory), initial_inventory=inventory
+        )
+        is None
+    )
+
+
+def test_unrecognized_item_only_confirms_success():
+    inventory = {"red_bed": 1}
+    assert (
+        check_task_rules(
+            "Obtain a bed",
+            make_events(inventory, errors=["Took too long"]),
+            initial_inventory=inventory,
+        )
+        is None
+    )
+    assert check_task_rules("Craft 1 wool", make_events({"wool": 1})) == (True, "")
+
+
+def test_cook_counts_the_cooked_product():
+    assert check_task_rules("Cook 1 beef", make_events({"beef": 2})) is None
+    assert check_task_rules("Cook 1 beef", make_events({"cooked_beef": 1})) == (True, "")
@@ -1,12 +1,18 @@
 import re
 import time
 
+import tiktoken
 import voyager.utils as U
 from javascript import require
+from javascript.errors import JavaScriptError
 from langchain.chat_models.openai import ChatOpenAI
 from langchain.prompts import SystemMessagePromptTemplate
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
 
+from voyager.agents.chest_memory import ChestMemory
+from voyager.agents.js_extractor import extract_functions
+from voyager.env.parser_pool import get_parser_pool
+from voyager.llm import RetryExecutor
 from voyager.prompts import load_prompt
 from voyager.control_primitives_context import load_control_primitives_context
 
@@ -21,58 +27,48 @@ class ActionAgent:
         resume=False,
         chat_log=True,
         execution_error=True,
+        skill_token_budget=None,
+        parser_workers=1,
+        fast_parse=True,
+        chest_radius=None,
+        chest_max_rendered=None,
+        chest_memory_size=None,
     ):
         self.ckpt_dir = ckpt_dir
         self.chat_log = chat_log
         self.execution_error = execution_error
+        self.skill_token_budget = skill_token_budget
+        self._encoding = None
+        self._skill_tokens = {}
+        self.fast_parse = fast_parse
+        # 0 parses through the javascript bridge only
+        self.parser_pool = get_parser_pool(parser_workers) if parser_workers else None
         U.f_mkdir(f"{ckpt_dir}/action")
         if resume:
             print(f"\033[32mLoading Action Agent from {ckpt_dir}/action\033[0m")
-            self.chest_memory = U.load_json(f"{ckpt_dir}/action/chest_memory.json")
-        else:
-            self.chest_memory = {}
+        # journaled, a step only writes the chests that changed
+        self.chest_memory = ChestMemory(
+            f"{ckpt_dir}/action/chest_memory.json",
+            resume=resume,
+            radius=chest_radius,
+            max_rendered=chest_max_rendered,
+            max_chests=chest_memory_size,
+        )
         self.llm = ChatOpenAI(
             model_name=model_name,
             temperature=temperature,
             request_timeout=request_timout,
+            # retries are handled by the retry executor
+            max_retries=1,
         )
+        self.retry_executor = RetryExecutor("Action Agent")
+        self._system_prefix, self._system_suffix = self.compile_system_message()
 
-    def update_chest_memory(self, chests):
-        for position, chest in chests.items():
-            if position in self.chest_memory:
-                if isinstance(chest, dict):
-                    self.chest_memory[position] = chest
-                if chest == "Invalid":
-                    print(
-                        f"\033[32mAction Agent removing chest {position}: {chest}\033[0m"
-                    )
-                    self.chest_memory.pop(position)
-            else:
-                if chest != "Invalid":
-                    print(f"\033[32mAction Agent saving chest {position}: {chest}\033[0m")
-                    self.chest_memory[position] = chest
-        U.dump_json(self.chest_memory, f"{self.ckpt_dir}/action/chest_memory.json")
-
-    def render_chest_observation(self):
-        chests = []
-        for chest_position, chest in self.chest_memory.items():
-            if isinstance(chest, dict) and len(chest) > 0:
-                chests.append(f"{chest_position}: {chest}")
-        for chest_position, chest in self.chest_memory.items():
-            if isinstance(chest, dict) and len(chest) == 0:
-                chests.append(f"{chest_position}: Empty")
-        for chest_position, chest in self.chest_memory.items():
-            if isinstance(chest, str):
-                assert chest == "Unknown"
-                chests.append(f"{chest_position}: Unknown items inside")
-        assert len(chests) == len(self.chest_memory)
-        if chests:
-            chests = "\n".join(chests)
-            return f"Chests:\n{chests}\n\n"
-        else:
-            return f"Chests: None\n\n"
-
-    def render_system_message(self, skills=[]):
+    def compile_system_message(self):
+        """
+        Render the static parts of the system prompt once.
+        :return: the text before and after the retrieved skills, the prefix already ends with the control primitives
+        """
         system_template = load_prompt("action_template")
         # FIXME: Hardcoded control_primitives
         base_skills = [
@@ -88,16 +84,79 @@ class ActionAgent:
             "useChest",
             "mineflayer",
         ]
-        programs = "\n\n".join(load_control_primitives_context(base_skills) + skills)
+        programs = "\n\n".join(load_control_primitives_context(base_skills))
         response_format = load_prompt("action_response_format")
         system_message_prompt = SystemMessagePromptTemplate.from_template(
             system_template
         )
+        sentinel = "\x00RETRIEVED_SKILLS\x00"
         system_message = system_message_prompt.format(
-            programs=programs, response_format=response_format
+            programs=programs + sentinel, response_format=response_format
         )
         assert isinstance(system_message, SystemMessage)
-        return system_message
+        prefix, suffix = system_message.content.split(sentinel)
+        return prefix, suffix
+
+    def count_tokens(self, text):
+        if text not in self._skill_tokens:
+            if self._encoding is None:
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.llm.model_name)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            self._skill_tokens[text] = len(self._encoding.encode(text))
+        return self._skill_tokens[text]
+
+    def select_skills(self, skills):
+        """
+        Keep retrieved skills in retrieval order while they fit into skill_token_budget.
+        """
+        if self.skill_token_budget is None:
+            return skills
+        selected = []
+        used = 0
+        for skill in skills:
+            tokens = self.count_tokens(skill)
+            if used + tokens > self.skill_token_budget:
+                continue
+            selected.append(skill)
+            used += tokens
+        if len(selected) < len(skills):
+            print(
+                f"\033[32mAction Agent kept {len(selected)}/{len(skills)} skills "
+                f"within {self.skill_token_budget} tokens\033[0m"
+            )
+        return selected
+
+    def update_chest_memory(self, chests, bot_position=None):
+        self.chest_memory.set_position(bot_position)
+        for position, chest in chests.items():
+            if self.chest_memory.is_evicted(position, chest):
+                continue
+            if position in self.chest_memory:
+                if isinstance(chest, dict) and self.chest_memory[position] != chest:
+                    self.chest_memory.set(position, chest)
+                if chest == "Invalid":
+                    print(
+                        f"\033[32mAction Agent removing chest {position}: {chest}\033[0m"
+                    )
+                    self.chest_memory.delete(position)
+            else:
+                if chest != "Invalid":
+                    print(f"\033[32mAction Agent saving chest {position}: {chest}\033[0m")
+                    self.chest_memory.set(position, chest)
+        for position in self.chest_memory.evict():
+            print(f"\033[32mAction Agent evicting chest {position}\033[0m")
+
+    def render_chest_observation(self, position=None):
+        return self.chest_memory.render(position)
+
+    def render_system_message(self, skills=[]):
+        skills = self.select_skills(skills)
+        content = self._system_prefix
+        if skills:
+            content += "\n\n" + "\n\n".join(skills)
+        return SystemMessage(content=content + self._system_suffix)
 
     def render_human_message(
         self, *, events, code="", task="", context="", critique=""
@@ -182,7 +241,7 @@ class ActionAgent:
             task == "Place and deposit useless items into a chest"
             or task.startswith("Deposit useless items into the chest at")
         ):
-            observation += self.render_chest_observation()
+            observation += self.render_chest_observation(position)
 
         observation += f"Task: {task}\n\n"
 
@@ -198,6 +257,51 @@ class ActionAgent:
 
         return HumanMessage(content=observation)
 
+    def parse_functions(self, code):
+        """
+        :return: the number of top-level statements and, for every top-level function declaration,
+        a dict with its name, type, generated code as body and parameter names as params
+        """
+        if self.fast_parse:
+            result = extract_functions(code)
+            if result is not None:
+                return result
+        if self.parser_pool is not None and self.parser_pool.available:
+            try:
+                reply = self.parser_pool.parse(code)
+                return reply["statements"], reply["functions"]
+            except RuntimeError as e:
+                print(
+                    f"\033[31mAction Agent parser worker failed, using the javascript bridge: {e}\033[0m"
+                )
+        babel = require("@babel/core")
+        babel_generator = require("@babel/generator").default
+
+        try:
+            parsed = babel.parse(code)
+        except JavaScriptError as e:
+            # a syntax error of the reply, same as a ValueError of the other parsers
+            raise ValueError(f"Invalid javascript: {e}") from e
+        functions = []
+        for node in parsed.program.body:
+            if node.type != "FunctionDeclaration":
+                continue
+            node_type = (
+                "AsyncFunctionDeclaration" if node["async"] else "FunctionDeclaration"
+            )
+            functions.append(
+                {
+                    "name": node.id.name,
+                    "type": node_type,
+                    "body": babel_generator(node).code,
+                    "params": [
+                        param.name if param.type == "Identifier" else None
+                        for param in node["params"]
+                    ],
+                }
+            )
+        return len(list(parsed.program.body)), functions
+
     def process_ai_message(self, message):
         assert isinstance(message, AIMessage)
 
@@ -205,30 +309,10 @@ class ActionAgent:
         error = None
         while retry > 0:
             try:
-                babel = require("@babel/core")
-                babel_generator = require("@babel/generator").default
-
                 code_pattern = re.compile(r"```(?:javascript|js)(.*?)```", re.DOTALL)
                 code = "\n".join(code_pattern.findall(message.content))
-                parsed = babel.parse(code)
-                functions = []
-                assert len(list(parsed.program.body)) > 0, "No functions found"
-                for i, node in enumerate(parsed.program.body):
-                    if node.type != "FunctionDeclaration":
-                        continue
-                    node_type = (
-                        "AsyncFunctionDeclaration"
-                        if node["async"]
-                        else "FunctionDeclaration"
-                    )
-                    functions.append(
-                        {
-                            "name": node.id.name,
-                            "type": node_type,
-                            "body": babel_generator(node).code,
-                            "params": list(node["params"]),
-                        }
-                    )
+                num_statements, functions = self.parse_functions(code)
+                assert num_statements > 0, "No functions found"
                 # find the last async function
                 main_function = None
                 for function in reversed(functions):
@@ -238,10 +322,9 @@ class ActionAgent:
                 assert (
                     main_function is not None
                 ), "No async function found. Your main function must be async."
-                assert (
-                    len(main_function["params"]) == 1
-                    and main_function["params"][0].name == "bot"
-                ), f"Main function {main_function['name']} must take a single argument named 'bot'"
+                assert main_function["params"] == [
+                    "bot"
+                ], f"Main function {main_function['name']} must take a single argument named 'bot'"
                 program_code = "\n\n".join(function["body"] for function in functions)
                 exec_code = f"await {main_function['name']}(bot);"
                 return {
@@ -249,6 +332,10 @@ class ActionAgent:
                     "program_name": main_function["name"],
                     "exec_code": exec_code,
                 }
+            except (AssertionError, ValueError) as e:
+                # the reply itself is invalid, retrying cannot fix it
+                error = e
+                break
             except Exception as e:
                 retry -= 1
                 error = e
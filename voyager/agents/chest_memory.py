@@ -0,0 +1,211 @@
+import heapq
+import math
+import re
+
+import voyager.utils as U
+
+POSITION_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_position(position):
+    """
+    :param position: chest position string as mineflayer's Vec3 prints it, e.g. "(12, 64, -3)"
+    :return: (x, y, z) or None
+    """
+    coords = POSITION_PATTERN.findall(position)
+    if len(coords) != 3:
+        return None
+    return tuple(float(c) for c in coords)
+
+
+class ChestMemory:
+    """
+    Chests the bot has seen, {position: items dict or "Unknown"}, persisted in a JournalStore.
+    Positions are indexed in a grid of bucket_size x bucket_size columns, so the observation can render only
+    the chests within radius blocks of the bot and / or the max_rendered nearest ones without scanning the
+    whole memory. Above max_chests entries the chests farthest from the bot are evicted.
+    """
+
+    def __init__(
+        self,
+        path,
+        resume=False,
+        radius=None,
+        max_rendered=None,
+        max_chests=None,
+        bucket_size=16,
+    ):
+        self.store = U.JournalStore(path, {}, resume=resume)
+        self.data = self.store.data
+        self.radius = radius
+        self.max_rendered = max_rendered
+        self.max_chests = max_chests
+        self.bucket_size = bucket_size
+        self.position = None
+        self._buckets = {}
+        self._coords = {}
+        self._updated = {}
+        self._clock = 0
+        # evicted chests with their content at eviction time, javascript keeps reporting every chest it saw
+        self._evicted = {}
+        self._rendered = None
+        for position in self.data:
+            self._index(position)
+        self.evict()
+
+    def __contains__(self, position):
+        return position in self.data
+
+    def __getitem__(self, position):
+        return self.data[position]
+
+    def __len__(self):
+        return len(self.data)
+
+    def items(self):
+        return self.data.items()
+
+    def _bucket(self, coords):
+        return (
+            math.floor(coords[0] / self.bucket_size),
+            math.floor(coords[2] / self.bucket_size),
+        )
+
+    def _index(self, position):
+        self._clock += 1
+        self._updated[position] = self._clock
+        if position in self._coords:
+            return
+        coords = parse_position(position)
+        self._coords[position] = coords
+        if coords is not None:
+            self._buckets.setdefault(self._bucket(coords), set()).add(position)
+
+    def _unindex(self, position):
+        self._updated.pop(position, None)
+        coords = self._coords.pop(position, None)
+        if coords is None:
+            return
+        bucket = self._bucket(coords)
+        self._buckets[bucket].discard(position)
+        if not self._buckets[bucket]:
+            del self._buckets[bucket]
+
+    def _distance(self, position):
+        coords = self._coords.get(position)
+        if coords is None:
+            return math.inf
+        if self.position is None:
+            return 0.0
+        return math.dist(coords, self.position)
+
+    def set_position(self, position):
+        """
+        :param position: the bot position as in the observe event, {"x": .., "y": .., "z": ..}
+        """
+        if position is not None:
+            self.position = (position["x"], position["y"], position["z"])
+
+    def set(self, position, chest):
+        self._evicted.pop(position, None)
+        self.store.set(position, chest)
+        self._index(position)
+        self._rendered = None
+
+    def delete(self, position):
+        self._evicted.pop(position, None)
+        self.store.delete(position)
+        self._unindex(position)
+        self._rendered = None
+
+    def is_evicted(self, position, chest):
+        """
+        Whether the chest was evicted and nothing changed since. It is admitted again once the bot is back
+        within the render radius (or one bucket) of it.
+        """
+        if position not in self._evicted or self._evicted[position] != chest:
+            return False
+        coords = parse_position(position)
+        if coords is None or self.position is None:
+            return True
+        return math.dist(coords, self.position) > (self.radius or self.bucket_size)
+
+    def evict(self):
+        if self.max_chests is None or len(self.data) <= self.max_chests:
+            return []
+        # farthest first, the least recently updated among equally far ones
+        evicted = heapq.nsmallest(
+            len(self.data) - self.max_chests,
+            self.data,
+            key=lambda p: (-self._distance(p), self._updated.get(p, 0)),
+        )
+        for position in evicted:
+            chest = self.data[position]
+            self.delete(position)
+            self._evicted[position] = chest
+        return evicted
+
+    def nearby(self):
+        """
+        :return: positions within radius of the bot, at most max_rendered of them, nearest first
+        """
+        if self.position is None or not self._buckets:
+            return [p for p in self.data if self._coords.get(p) is not None][
+                : self.max_rendered
+            ]
+        cx, cz = self._bucket(self.position)
+        max_ring = max(
+            max(abs(bx - cx), abs(bz - cz)) for bx, bz in self._buckets.keys()
+        )
+        if self.radius is not None:
+            max_ring = min(max_ring, math.ceil(self.radius / self.bucket_size))
+        found = []
+        for ring in range(max_ring + 1):
+            if (
+                self.max_rendered is not None
+                and len(found) >= self.max_rendered
+                and (ring - 1) * self.bucket_size
+                > heapq.nsmallest(self.max_rendered, found)[-1][0]
+            ):
+                # no chest in this ring or farther can be nearer than the ones found
+                break
+            for bx in range(cx - ring, cx + ring + 1):
+                for bz in range(cz - ring, cz + ring + 1):
+                    if max(abs(bx - cx), abs(bz - cz)) != ring:
+                        continue
+                    for position in self._buckets.get((bx, bz), ()):
+                        distance = self._distance(position)
+                        if self.radius is None or distance <= self.radius:
+                            found.append((distance, position))
+        found.sort()
+        return [position for _, position in found[: self.max_rendered]]
+
+    def render(self, position=None):
+        self.set_position(position)
+        limited = self.radius is not None or self.max_rendered is not None
+        if not limited and self._rendered is not None:
+            return self._rendered
+        positions = self.nearby() if limited else list(self.data)
+        chests = []
+        for chest_position in positions:
+            chest = self.data[chest_position]
+            if isinstance(chest, dict) and len(chest) > 0:
+                chests.append(f"{chest_position}: {chest}")
+        for chest_position in positions:
+            chest = self.data[chest_position]
+            if isinstance(chest, dict) and len(chest) == 0:
+                chests.append(f"{chest_position}: Empty")
+        for chest_position in positions:
+            chest = self.data[chest_position]
+            if isinstance(chest, str):
+                assert chest == "Unknown"
+                chests.append(f"{chest_position}: Unknown items inside")
+        assert len(chests) == len(positions)
+        if chests:
+            chests = "\n".join(chests)
+            rendered = f"Chests:\n{chests}\n\n"
+        else:
+            rendered = "Chests: None\n\n"
+        if not limited:
+            self._rendered = rendered
+        return rendered
@@ -2,6 +2,8 @@ from voyager.prompts import load_prompt
 from voyager.utils.json_utils import fix_and_parse_json
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
+from voyager.llm import cache_chat_model, RetryExecutor, LLMParseError, CircuitOpenError
+from voyager.agents.task_rules import check_task_rules
 
 
 class CriticAgent:
@@ -11,14 +13,21 @@ class CriticAgent:
         temperature=0,
         request_timout=120,
         mode="auto",
+        llm_cache=None,
+        rule_check=True,
     ):
         self.llm = ChatOpenAI(
             model_name=model_name,
             temperature=temperature,
             request_timeout=request_timout,
+            # retries are handled by the retry executor
+            max_retries=1,
         )
+        self.retry_executor = RetryExecutor("Critic Agent")
+        self.llm = cache_chat_model(self.llm, llm_cache, name="critic")
         assert mode in ["auto", "manual"]
         self.mode = mode
+        self.rule_check = rule_check
 
     def render_system_message(self):
         system_message = SystemMessage(content=load_prompt("critic"))
@@ -108,34 +117,50 @@ class CriticAgent:
             confirmed = input("Confirm? (y/n)") in ["y", ""]
         return success, critique
 
+    def parse_ai_message(self, critic):
+        print(f"\033[31m****Critic Agent ai message****\n{critic}\033[0m")
+        response = fix_and_parse_json(critic)
+        assert response["success"] in [True, False]
+        if "critique" not in response:
+            response["critique"] = ""
+        return response["success"], response["critique"]
+
     def ai_check_task_success(self, messages, max_retries=5):
-        if max_retries == 0:
+        if messages[1] is None:
+            return False, ""
+        try:
+            return self.retry_executor.run(
+                self.llm,
+                messages,
+                parse=self.parse_ai_message,
+                max_retries=max_retries,
+            )
+        except LLMParseError:
             print(
                 "\033[31mFailed to parse Critic Agent response. Consider updating your prompt.\033[0m"
             )
             return False, ""
-
-        if messages[1] is None:
+        except CircuitOpenError as e:
+            print(f"\033[31mCritic Agent LLM is unavailable: {e}\033[0m")
             return False, ""
 
-        critic = self.llm(messages).content
-        print(f"\033[31m****Critic Agent ai message****\n{critic}\033[0m")
-        try:
-            response = fix_and_parse_json(critic)
-            assert response["success"] in [True, False]
-            if "critique" not in response:
-                response["critique"] = ""
-            return response["success"], response["critique"]
-        except Exception as e:
-            print(f"\033[31mError parsing critic response: {e} Trying again!\033[0m")
-            return self.ai_check_task_success(
-                messages=messages,
-                max_retries=max_retries - 1,
-            )
-
     def check_task_success(
-        self, *, events, task, context, chest_observation, max_retries=5
+        self,
+        *,
+        events,
+        task,
+        context,
+        chest_observation,
+        max_retries=5,
+        initial_inventory=None,
     ):
+        if self.mode == "auto" and self.rule_check:
+            result = check_task_rules(task, events, initial_inventory)
+            if result is not None:
+                print(
+                    f"\033[31m****Critic Agent rule check****\nsuccess: {result[0]}, critique: {result[1]}\033[0m"
+                )
+                return result
         human_message = self.render_human_message(
             events=events,
             task=task,
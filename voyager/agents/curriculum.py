@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import random
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 import voyager.utils as U
 from voyager.prompts import load_prompt
 from voyager.utils.json_utils import fix_and_parse_json
+from voyager.retrieval import get_embedding_function
+from voyager.llm import cache_chat_model, RetryExecutor, LLMParseError
+from .task_history import TaskHistory
 from langchain.chat_models import ChatOpenAI
-from langchain.embeddings.openai import OpenAIEmbeddings
 from langchain.schema import HumanMessage, SystemMessage
 from langchain.vectorstores import Chroma
 
@@ -25,17 +28,29 @@ class CurriculumAgent:
         mode="auto",
         warm_up=None,
         core_inventory_items: str | None = None,
+        embedding_model="openai",
+        embedding_cache_path=None,
+        llm_cache=None,
+        qa_max_workers=4,
     ):
         self.llm = ChatOpenAI(
             model_name=model_name,
             temperature=temperature,
             request_timeout=request_timout,
+            # retries are handled by the retry executor
+            max_retries=1,
         )
         self.qa_llm = ChatOpenAI(
             model_name=qa_model_name,
             temperature=qa_temperature,
             request_timeout=request_timout,
+            max_retries=1,
         )
+        self.retry_executor = RetryExecutor("Curriculum Agent")
+        # how many QA questions are answered concurrently
+        self.qa_max_workers = qa_max_workers
+        self.llm = cache_chat_model(self.llm, llm_cache, name="curriculum")
+        self.qa_llm = cache_chat_model(self.qa_llm, llm_cache, name="curriculum_qa")
         assert mode in [
             "auto",
             "manual",
@@ -45,19 +60,21 @@ class CurriculumAgent:
         U.f_mkdir(f"{ckpt_dir}/curriculum/vectordb")
         if resume:
             print(f"\033[35mLoading Curriculum Agent from {ckpt_dir}/curriculum\033[0m")
-            self.completed_tasks = U.load_json(
-                f"{ckpt_dir}/curriculum/completed_tasks.json"
-            )
-            self.failed_tasks = U.load_json(f"{ckpt_dir}/curriculum/failed_tasks.json")
-            self.qa_cache = U.load_json(f"{ckpt_dir}/curriculum/qa_cache.json")
-        else:
-            self.completed_tasks = []
-            self.failed_tasks = []
-            self.qa_cache = {}
+        # journaled state files, replayed on resume
+        self.task_history = TaskHistory(f"{ckpt_dir}/curriculum", resume=resume)
+        self.qa_cache_store = U.JournalStore(
+            f"{ckpt_dir}/curriculum/qa_cache.json", {}, resume=resume
+        )
+        self.completed_tasks = self.task_history.completed_tasks
+        self.failed_tasks = self.task_history.failed_tasks
+        self.qa_cache = self.qa_cache_store.data
         # vectordb for qa cache
+        self.qa_cache_embedding_function = get_embedding_function(
+            embedding_model, cache_path=embedding_cache_path
+        )
         self.qa_cache_questions_vectordb = Chroma(
             collection_name="qa_cache_questions_vectordb",
-            embedding_function=OpenAIEmbeddings(),
+            embedding_function=self.qa_cache_embedding_function,
             persist_directory=f"{ckpt_dir}/curriculum/vectordb",
         )
         assert self.qa_cache_questions_vectordb._collection.count() == len(
@@ -175,10 +192,8 @@ class CurriculumAgent:
             else "None"
         )
 
-        completed_tasks = (
-            ", ".join(self.completed_tasks) if self.completed_tasks else "None"
-        )
-        failed_tasks = ", ".join(self.failed_tasks) if self.failed_tasks else "None"
+        completed_tasks = self.task_history.completed_text
+        failed_tasks = self.task_history.failed_text
 
         # filter out optional inventory items if required
         if self.progress < self.warm_up["optional_inventory_items"]:
@@ -290,25 +305,20 @@ class CurriculumAgent:
             raise ValueError(f"Invalid curriculum agent mode: {self.mode}")
 
     def propose_next_ai_task(self, *, messages, max_retries=5):
-        if max_retries == 0:
-            raise RuntimeError("Max retries reached, failed to propose ai task.")
-        curriculum = self.llm(messages).content
-        print(f"\033[31m****Curriculum Agent ai message****\n{curriculum}\033[0m")
         try:
-            response = self.parse_ai_message(curriculum)
-            assert "next_task" in response
-            context = self.get_task_context(response["next_task"])
-            return response["next_task"], context
-        except Exception as e:
-            print(
-                f"\033[35mError parsing curriculum response: {e}. Trying again!\033[0m"
-            )
-            return self.propose_next_ai_task(
-                messages=messages,
-                max_retries=max_retries - 1,
+            response = self.retry_executor.run(
+                self.llm,
+                messages,
+                parse=self.parse_ai_message,
+                max_retries=max_retries,
             )
+        except LLMParseError:
+            raise RuntimeError("Max retries reached, failed to propose ai task.")
+        context = self.get_task_context(response["next_task"])
+        return response["next_task"], context
 
     def parse_ai_message(self, message):
+        print(f"\033[31m****Curriculum Agent ai message****\n{message}\033[0m")
         task = ""
         for line in message.split("\n"):
             if line.startswith("Task:"):
@@ -333,38 +343,18 @@ class CurriculumAgent:
             return
         if info["success"]:
             print(f"\033[35mCompleted task {task}.\033[0m")
-            self.completed_tasks.append(task)
+            self.task_history.add_completed(task)
         else:
             print(
                 f"\033[35mFailed to complete task {task}. Skipping to next task.\033[0m"
             )
-            self.failed_tasks.append(task)
-
-        # clean up tasks and dump to disk
-        self.clean_up_tasks()
+            self.task_history.add_failed(task)
 
     def clean_up_tasks(self):
-        updated_completed_tasks = []
-        # record repeated failed tasks
-        updated_failed_tasks = self.failed_tasks
-        # dedup but keep order
-        for task in self.completed_tasks:
-            if task not in updated_completed_tasks:
-                updated_completed_tasks.append(task)
-
-        # remove completed tasks from failed tasks
-        for task in updated_completed_tasks:
-            while task in updated_failed_tasks:
-                updated_failed_tasks.remove(task)
-
-        self.completed_tasks = updated_completed_tasks
-        self.failed_tasks = updated_failed_tasks
-
-        # dump to json
-        U.dump_json(
-            self.completed_tasks, f"{self.ckpt_dir}/curriculum/completed_tasks.json"
-        )
-        U.dump_json(self.failed_tasks, f"{self.ckpt_dir}/curriculum/failed_tasks.json")
+        self.task_history.clean_up()
+
+    def reset_tasks(self):
+        self.task_history.reset()
 
     def decompose_task(self, task, events):
         messages = [
@@ -377,40 +367,75 @@ class CurriculumAgent:
         print(
             f"\033[31m****Curriculum Agent task decomposition****\nFinal task: {task}\033[0m"
         )
-        response = self.llm(messages).content
+        response = self.retry_executor.run(self.llm, messages).content
         print(f"\033[31m****Curriculum Agent task decomposition****\n{response}\033[0m")
         return fix_and_parse_json(response)
 
+    def lookup_qa_cache(self, questions):
+        """
+        Find cached answers for all questions with a single vectordb query.
+        Questions are embedded with embed_query, as similarity_search_with_score does. The langchain Chroma
+        wrapper has no public search for several queries that returns distances, so the collection is
+        queried directly.
+        :return: a list aligned with questions, (cached question, answer) or None on a miss
+        """
+        results = [None] * len(questions)
+        if not questions or self.qa_cache_questions_vectordb._collection.count() == 0:
+            return results
+        query_embeddings = [
+            self.qa_cache_embedding_function.embed_query(question)
+            for question in questions
+        ]
+        matches = self.qa_cache_questions_vectordb._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=1,
+            include=["documents", "distances"],
+        )
+        for i, (documents, distances) in enumerate(
+            zip(matches["documents"], matches["distances"])
+        ):
+            if documents and distances[0] < 0.05:
+                question_cached = documents[0]
+                assert question_cached in self.qa_cache
+                results[i] = (question_cached, self.qa_cache[question_cached])
+        return results
+
     def run_qa(self, *, events, chest_observation):
         questions_new, _ = self.run_qa_step1_ask_questions(
             events=events, chest_observation=chest_observation
         )
-        questions = []
-        answers = []
-        for question in questions_new:
-            if self.qa_cache_questions_vectordb._collection.count() > 0:
-                docs_and_scores = (
-                    self.qa_cache_questions_vectordb.similarity_search_with_score(
-                        question, k=1
+        cached = self.lookup_qa_cache(questions_new)
+        misses = []
+        for question, hit in zip(questions_new, cached):
+            if hit is None and question not in misses:
+                misses.append(question)
+        if misses:
+            with ThreadPoolExecutor(
+                max_workers=min(self.qa_max_workers, len(misses))
+            ) as executor:
+                new_answers = dict(
+                    zip(
+                        misses,
+                        executor.map(
+                            lambda question: self.run_qa_step2_answer_questions(
+                                question=question
+                            ),
+                            misses,
+                        ),
                     )
                 )
-                if docs_and_scores and docs_and_scores[0][1] < 0.05:
-                    question_cached = docs_and_scores[0][0].page_content
-                    assert question_cached in self.qa_cache
-                    answer_cached = self.qa_cache[question_cached]
-                    questions.append(question_cached)
-                    answers.append(answer_cached)
-                    continue
-            answer = self.run_qa_step2_answer_questions(question=question)
-            assert question not in self.qa_cache
-            self.qa_cache[question] = answer
-            self.qa_cache_questions_vectordb.add_texts(
-                texts=[question],
-            )
-            U.dump_json(self.qa_cache, f"{self.ckpt_dir}/curriculum/qa_cache.json")
+            for question in misses:
+                assert question not in self.qa_cache
+            self.qa_cache_store.update(new_answers)
+            self.qa_cache_questions_vectordb.add_texts(texts=misses)
             self.qa_cache_questions_vectordb.persist()
-            questions.append(question)
-            answers.append(answer)
+        questions = []
+        answers = []
+        for question, hit in zip(questions_new, cached):
+            if hit is None:
+                hit = (question, self.qa_cache[question])
+            questions.append(hit[0])
+            answers.append(hit[1])
         assert len(questions_new) == len(questions) == len(answers)
         return questions, answers
 
@@ -424,11 +449,10 @@ class CurriculumAgent:
             answer = self.qa_cache[question]
         else:
             answer = self.run_qa_step2_answer_questions(question=question)
-            self.qa_cache[question] = answer
+            self.qa_cache_store.set(question, answer)
             self.qa_cache_questions_vectordb.add_texts(
                 texts=[question],
             )
-            U.dump_json(self.qa_cache, f"{self.ckpt_dir}/curriculum/qa_cache.json")
             self.qa_cache_questions_vectordb.persist()
         context = f"Question: {question}\n{answer}"
         return context
@@ -459,7 +483,7 @@ class CurriculumAgent:
                 events=events, chest_observation=chest_observation
             ),
         ]
-        qa_response = self.qa_llm(messages).content
+        qa_response = self.retry_executor.run(self.qa_llm, messages).content
         try:
             # Regex pattern to extract question and concept pairs
             pattern = r"Question \d+: (.+)\nConcept \d+: (.+)"
@@ -493,6 +517,6 @@ class CurriculumAgent:
             self.render_human_message_qa_step2_answer_questions(question=question),
         ]
         print(f"\033[35mCurriculum Agent Question: {question}\033[0m")
-        qa_answer = self.qa_llm(messages).content
+        qa_answer = self.retry_executor.run(self.qa_llm, messages).content
         print(f"\033[31mCurriculum Agent {qa_answer}\033[0m")
         return qa_answer
@@ -0,0 +1,234 @@
+import re
+
+IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+RESERVED = set(
+    "await break case catch class const continue debugger default delete do else enum export "
+    "extends false finally for function if import in instanceof new null return super switch "
+    "this throw true try typeof var void while with yield let static".split()
+)
+# a "/" after these words starts a regex literal, not a division
+REGEX_PRECEDING_WORDS = set(
+    "return typeof instanceof in of new delete void throw case do else yield await".split()
+)
+BRACKETS = {"(": ")", "[": "]", "{": "}"}
+
+
+def _skip_space(code, i):
+    """
+    :return: index of the next character that is not whitespace or a comment, None on an unterminated comment
+    """
+    n = len(code)
+    while i < n:
+        if code[i].isspace():
+            i += 1
+        elif code.startswith("//", i):
+            j = code.find("\n", i)
+            i = n if j < 0 else j + 1
+        elif code.startswith("/*", i):
+            j = code.find("*/", i + 2)
+            if j < 0:
+                return None
+            i = j + 2
+        else:
+            break
+    return i
+
+
+def _skip_string(code, i):
+    quote = code[i]
+    i += 1
+    while i < len(code):
+        c = code[i]
+        if c == "\\":
+            i += 2
+        elif c == quote:
+            return i + 1
+        elif c == "\n":
+            return None
+        else:
+            i += 1
+    return None
+
+
+def _skip_template(code, i):
+    i += 1
+    while i < len(code):
+        c = code[i]
+        if c == "\\":
+            i += 2
+        elif c == "`":
+            return i + 1
+        elif code.startswith("${", i):
+            i = _match_bracket(code, i + 1)
+            if i is None:
+                return None
+        else:
+            i += 1
+    return None
+
+
+def _skip_regex(code, i):
+    i += 1
+    in_class = False
+    while i < len(code):
+        c = code[i]
+        if c == "\\":
+            i += 2
+        elif c == "\n":
+            return None
+        elif c == "[":
+            in_class = True
+            i += 1
+        elif c == "]":
+            in_class = False
+            i += 1
+        elif c == "/" and not in_class:
+            i += 1
+            while i < len(code) and (code[i].isalnum() or code[i] in "_$"):
+                i += 1
+            return i
+        else:
+            i += 1
+    return None
+
+
+def _match_bracket(code, i):
+    """
+    :param i: index of an opening bracket
+    :return: index right after its matching closing bracket, None if the brackets do not balance
+    """
+    stack = []
+    # last significant token, decides whether "/" is a division or a regex literal
+    prev = ""
+    n = len(code)
+    while i < n:
+        c = code[i]
+        if c.isspace() or code.startswith("//", i) or code.startswith("/*", i):
+            i = _skip_space(code, i)
+            if i is None:
+                return None
+            continue
+        if c in "\"'":
+            i = _skip_string(code, i)
+            prev = "value"
+        elif c == "`":
+            i = _skip_template(code, i)
+            prev = "value"
+        elif c == "/":
+            if prev == "value":
+                i += 1
+                prev = "/"
+                continue
+            i = _skip_regex(code, i)
+            prev = "value"
+        elif c.isalnum() or c in "_$":
+            match = IDENTIFIER.match(code, i)
+            if match is None:
+                # number literal
+                while i < n and (code[i].isalnum() or code[i] in "._"):
+                    i += 1
+                prev = "value"
+                continue
+            i = match.end()
+            word = match.group()
+            prev = word if word in REGEX_PRECEDING_WORDS else "value"
+            continue
+        elif c in BRACKETS:
+            stack.append(BRACKETS[c])
+            i += 1
+            prev = c
+            continue
+        elif c in ")]}":
+            if not stack or stack.pop() != c:
+                return None
+            i += 1
+            if not stack:
+                return i
+            prev = "value"
+            continue
+        else:
+            i += 1
+            prev = c
+            continue
+        if i is None:
+            return None
+    return None
+
+
+def _parse_params(text):
+    """
+    :return: parameter names, None unless every parameter is a plain identifier
+    """
+    params = [param.strip() for param in text.split(",")]
+    if params and params[-1] == "":
+        params.pop()
+    for param in params:
+        if not IDENTIFIER.fullmatch(param) or param in RESERVED:
+            return None
+    return params
+
+
+def extract_functions(code):
+    """
+    Fast path for ActionAgent.parse_functions that works on the tokens of the source instead of a full AST.
+    It handles strings, template literals, comments and regex literals while matching brackets.
+    :return: the number of top-level statements and the functions in the same format as the Babel path,
+    None when the code is anything but plain top-level function declarations and Babel has to decide
+    """
+    functions = []
+    num_statements = 0
+    i = 0
+    n = len(code)
+    while True:
+        i = _skip_space(code, i)
+        if i is None:
+            return None
+        if i >= n:
+            break
+        if code[i] == ";":
+            # empty statement
+            num_statements += 1
+            i += 1
+            continue
+        start = i
+        is_async = False
+        match = IDENTIFIER.match(code, i)
+        if match is not None and match.group() == "async":
+            i = _skip_space(code, match.end())
+            if i is None or "\n" in code[match.end() : i]:
+                return None
+            is_async = True
+            match = IDENTIFIER.match(code, i)
+        if match is None or match.group() != "function":
+            return None
+        i = _skip_space(code, match.end())
+        match = IDENTIFIER.match(code, i) if i is not None else None
+        if match is None or match.group() in RESERVED:
+            return None
+        name = match.group()
+        i = _skip_space(code, match.end())
+        if i is None or not code.startswith("(", i):
+            return None
+        end = _match_bracket(code, i)
+        if end is None:
+            return None
+        params = _parse_params(code[i + 1 : end - 1])
+        if params is None:
+            return None
+        i = _skip_space(code, end)
+        if i is None or not code.startswith("{", i):
+            return None
+        end = _match_bracket(code, i)
+        if end is None:
+            return None
+        functions.append(
+            {
+                "name": name,
+                "type": "AsyncFunctionDeclaration" if is_async else "FunctionDeclaration",
+                "body": code[start:end],
+                "params": params,
+            }
+        )
+        num_statements += 1
+        i = end
+    return num_statements, functions
@@ -1,13 +1,41 @@
+import hashlib
 import os
 
 import voyager.utils as U
 from langchain.chat_models import ChatOpenAI
-from langchain.embeddings.openai import OpenAIEmbeddings
 from langchain.schema import HumanMessage, SystemMessage
 from langchain.vectorstores import Chroma
 
 from voyager.prompts import load_prompt
 from voyager.control_primitives import load_control_primitives
+from voyager.retrieval import get_embedding_function, NumpyVectorStore
+from voyager.retrieval.migrate import load_chroma_embeddings
+from voyager.retrieval.service import SkillRetrievalClient
+from voyager.llm import RetryExecutor
+from voyager.env.program_registry import program_hash
+
+
+class ProgramBundle(tuple):
+    """
+    Immutable snapshot of the programs sent to the env: learned skills followed by control primitives.
+    Carries the content hash of every program and a version hash of the whole bundle,
+    so downstream caches can key on it instead of re-hashing the sources.
+    """
+
+    def __new__(cls, programs, hashes=None):
+        bundle = super().__new__(cls, programs)
+        if hashes is None:
+            hashes = [program_hash(program) for program in programs]
+        bundle.hashes = tuple(hashes)
+        bundle.version = hashlib.sha1("".join(bundle.hashes).encode("utf-8")).hexdigest()
+        bundle._source = None
+        return bundle
+
+    @property
+    def source(self):
+        if self._source is None:
+            self._source = "".join(f"{program}\n\n" for program in self)
+        return self._source
 
 
 class SkillManager:
@@ -19,15 +47,32 @@ class SkillManager:
         request_timout=120,
         ckpt_dir="ckpt",
         resume=False,
+        embedding_model="openai",
+        embedding_cache_path=None,
+        vectordb="chroma",
+        retrieval_address=None,
+        read_only=False,
     ):
-        self.llm = ChatOpenAI(
-            model_name=model_name,
-            # temperature=temperature,
-            request_timeout=request_timout,
-        )
-        U.f_mkdir(f"{ckpt_dir}/skill/code")
-        U.f_mkdir(f"{ckpt_dir}/skill/description")
-        U.f_mkdir(f"{ckpt_dir}/skill/vectordb")
+        """
+        :param read_only: only serve retrieval from an existing library, e.g. in a SkillRetrievalServer.
+        No LLM is created and nothing is written to ckpt_dir, the vectordb is loaded as an in-memory snapshot
+        and a library whose vectordb is not synced with skills.json raises a RuntimeError.
+        """
+        self.read_only = read_only
+        self.retry_executor = RetryExecutor("Skill Manager")
+        if read_only:
+            self.llm = None
+        else:
+            self.llm = ChatOpenAI(
+                model_name=model_name,
+                # temperature=temperature,
+                request_timeout=request_timout,
+                # retries are handled by the retry executor
+                max_retries=1,
+            )
+            U.f_mkdir(f"{ckpt_dir}/skill/code")
+            U.f_mkdir(f"{ckpt_dir}/skill/description")
+            U.f_mkdir(f"{ckpt_dir}/skill/vectordb")
         # programs for env execution
         self.control_primitives = load_control_primitives()
         if resume:
@@ -37,10 +82,37 @@ class SkillManager:
             self.skills = {}
         self.retrieval_top_k = retrieval_top_k
         self.ckpt_dir = ckpt_dir
+        self._program_list = None
+        self.embedding_function = get_embedding_function(
+            embedding_model, cache_path=embedding_cache_path
+        )
+        assert vectordb in ["chroma", "numpy"], f"vectordb {vectordb} not supported"
+        self.vectordb_type = vectordb
+        self.retrieval_client = None
+        if retrieval_address:
+            # retrieval is served by a SkillRetrievalServer on this host,
+            # the local index is only opened once this process adds a skill
+            self.retrieval_client = SkillRetrievalClient(retrieval_address)
+            self.vectordb = None
+            return
+        self._load_vectordb()
+
+    def _load_vectordb(self):
+        if self.read_only:
+            self._load_vectordb_snapshot()
+            return
+        if self.vectordb_type == "numpy":
+            # single file next to skills.json, see voyager.retrieval.migrate for existing chroma dbs
+            self.vectordb = NumpyVectorStore(
+                f"{self.ckpt_dir}/skill/vectordb.npy",
+                embedding_function=self.embedding_function,
+            )
+            self._sync_numpy_vectordb()
+            return
         self.vectordb = Chroma(
             collection_name="skill_vectordb",
-            embedding_function=OpenAIEmbeddings(),
-            persist_directory=f"{ckpt_dir}/skill/vectordb",
+            embedding_function=self.embedding_function,
+            persist_directory=f"{self.ckpt_dir}/skill/vectordb",
         )
         assert self.vectordb._collection.count() == len(self.skills), (
             f"Skill Manager's vectordb is not synced with skills.json.\n"
@@ -49,28 +121,122 @@ class SkillManager:
             f"You may need to manually delete the vectordb directory for running from scratch."
         )
 
+    def _load_vectordb_snapshot(self):
+        if self.vectordb_type == "numpy":
+            self.vectordb = NumpyVectorStore(
+                f"{self.ckpt_dir}/skill/vectordb.npy",
+                embedding_function=self.embedding_function,
+            )
+        else:
+            # chroma indexes are searched in memory by cosine distance,
+            # which ranks like chroma's l2 distance for normalized embeddings
+            ids, embeddings = load_chroma_embeddings(
+                f"{self.ckpt_dir}/skill/vectordb", "skill_vectordb"
+            )
+            self.vectordb = NumpyVectorStore(
+                None, embedding_function=self.embedding_function
+            )
+            if ids:
+                self.vectordb.add_embeddings(embeddings, ids)
+            self.vectordb_type = "numpy"
+        if set(self.vectordb.ids) != set(self.skills):
+            raise RuntimeError(
+                f"Skill Manager's vectordb is not synced with skills.json, "
+                f"{self.vectordb.count()} vs {len(self.skills)} skills"
+            )
+
+    def _sync_numpy_vectordb(self):
+        # skills.json holds the descriptions, so the index can always be repaired from it
+        stale = [name for name in self.vectordb.ids if name not in self.skills]
+        missing = [name for name in self.skills if name not in set(self.vectordb.ids)]
+        if not stale and not missing:
+            return
+        print(
+            f"\033[33mSkill Manager syncing vectordb with skills.json: "
+            f"removing {len(stale)}, embedding {len(missing)} skills\033[0m"
+        )
+        self.vectordb.delete(stale)
+        if missing:
+            self.vectordb.add_texts(
+                texts=[self.skills[name]["description"] for name in missing],
+                ids=missing,
+            )
+        self.vectordb.persist()
+
+    def _vectordb_count(self):
+        if self.vectordb_type == "numpy":
+            return self.vectordb.count()
+        return self.vectordb._collection.count()
+
+    def _vectordb_search(self, query, k):
+        if self.vectordb_type == "numpy":
+            return [name for name, _ in self.vectordb.search(query, k=k)]
+        docs_and_scores = self.vectordb.similarity_search_with_score(query, k=k)
+        return [doc.metadata["name"] for doc, _ in docs_and_scores]
+
+    def _vectordb_search_batch(self, query_vectors, k):
+        if self.vectordb_type == "numpy":
+            results = self.vectordb.search_by_vectors(query_vectors, k=k)
+            return [[name for name, _ in result] for result in results]
+        results = self.vectordb._collection.query(
+            query_embeddings=query_vectors, n_results=k
+        )
+        return results["ids"]
+
     @property
     def programs(self):
-        programs = ""
-        for skill_name, entry in self.skills.items():
-            programs += f"{entry['code']}\n\n"
-        for primitives in self.control_primitives:
-            programs += f"{primitives}\n\n"
-        return programs
+        return self.program_list.source
+
+    @property
+    def program_list(self):
+        # rebuilt only when add_new_skill changes the library
+        if self._program_list is None:
+            self._program_list = ProgramBundle(
+                [entry["code"] for entry in self.skills.values()]
+                + list(self.control_primitives)
+            )
+        return self._program_list
+
+    @property
+    def programs_version(self):
+        return self.program_list.version
+
+    def _update_program_list(self, program_name, program_code, is_rewrite):
+        if self._program_list is None:
+            return
+        programs = list(self._program_list)
+        hashes = list(self._program_list.hashes)
+        if is_rewrite:
+            index = list(self.skills.keys()).index(program_name)
+        else:
+            # skills come before the control primitives
+            index = len(self.skills) - 1
+            programs.insert(index, None)
+            hashes.insert(index, None)
+        programs[index] = program_code
+        hashes[index] = program_hash(program_code)
+        self._program_list = ProgramBundle(programs, hashes)
 
     def add_new_skill(self, info):
         if info["task"].startswith("Deposit useless items into the chest at"):
             # No need to reuse the deposit skill
             return
+        assert not self.read_only, "cannot add skills to a read-only Skill Manager"
         program_name = info["program_name"]
         program_code = info["program_code"]
         skill_description = self.generate_skill_description(program_name, program_code)
         print(
             f"\033[33mSkill Manager generated description for {program_name}:\n{skill_description}\033[0m"
         )
-        if program_name in self.skills:
+        if self.vectordb is None:
+            self._load_vectordb()
+        is_rewrite = program_name in self.skills
+        if is_rewrite:
             print(f"\033[33mSkill {program_name} already exists. Rewriting!\033[0m")
-            self.vectordb._collection.delete(ids=[program_name])
+            if self.vectordb_type == "numpy":
+                self.vectordb.delete([program_name])
+            else:
+                self.vectordb._collection.delete(ids=[program_name])
             i = 2
             while f"{program_name}V{i}.js" in os.listdir(f"{self.ckpt_dir}/skill/code"):
                 i += 1
@@ -86,7 +252,8 @@ class SkillManager:
             "code": program_code,
             "description": skill_description,
         }
-        assert self.vectordb._collection.count() == len(
+        self._update_program_list(program_name, program_code, is_rewrite)
+        assert self._vectordb_count() == len(
             self.skills
         ), "vectordb is not synced with skills.json"
         U.dump_text(
@@ -96,8 +263,9 @@ class SkillManager:
             skill_description,
             f"{self.ckpt_dir}/skill/description/{dumped_program_name}.txt",
         )
-        U.dump_json(self.skills, f"{self.ckpt_dir}/skill/skills.json")
+        # the vectordb first, retrieval servers reload once skills.json changes
         self.vectordb.persist()
+        U.dump_json(self.skills, f"{self.ckpt_dir}/skill/skills.json")
 
     def generate_skill_description(self, program_name, program_code):
         messages = [
@@ -108,24 +276,47 @@ class SkillManager:
                 + f"The main function is `{program_name}`."
             ),
         ]
-        skill_description = f"    // { self.llm(messages).content}"
+        skill_description = (
+            f"    // {self.retry_executor.run(self.llm, messages).content}"
+        )
         return f"async function {program_name}(bot) {{\n{skill_description}\n}}"
 
     def retrieve_skills(self, query):
-        k = min(self.vectordb._collection.count(), self.retrieval_top_k)
+        if self.retrieval_client is not None:
+            return self.retrieval_client.retrieve_skills(query)
+        k = min(self._vectordb_count(), self.retrieval_top_k)
         if k == 0:
             return []
         print(f"\033[33mSkill Manager retrieving for {k} skills\033[0m")
-        docs_and_scores = self.vectordb.similarity_search_with_score(query, k=k)
+        names = self._vectordb_search(query, k)
         print(
             f"\033[33mSkill Manager retrieved skills: "
-            f"{', '.join([doc.metadata['name'] for doc, _ in docs_and_scores])}\033[0m"
+            f"{', '.join(names)}\033[0m"
         )
         skills = []
-        for doc, _ in docs_and_scores:
-            skills.append(self.skills[doc.metadata["name"]]["code"])
+        for name in names:
+            skills.append(self.skills[name]["code"])
         return skills
 
+    def retrieve_skills_batch(self, queries):
+        """
+        Retrieve skills for many queries at once, scored against the library in one matrix operation.
+        Queries are embedded with embed_query like retrieve_skills does, so both rank skills the same way.
+        :return: a list of skill codes for every query
+        """
+        if self.retrieval_client is not None:
+            return self.retrieval_client.retrieve_skills_batch(queries)
+        queries = list(queries)
+        k = min(self._vectordb_count(), self.retrieval_top_k)
+        if k == 0 or not queries:
+            return [[] for _ in queries]
+        print(
+            f"\033[33mSkill Manager retrieving for {k} skills for {len(queries)} queries\033[0m"
+        )
+        query_vectors = [self.embedding_function.embed_query(query) for query in queries]
+        results = self._vectordb_search_batch(query_vectors, k)
+        return [[self.skills[name]["code"] for name in names] for names in results]
+
     def get_skill_index(self):
             """
             Global Planner için beceri isimlerini ve kısa açıklamalarını döndürür.
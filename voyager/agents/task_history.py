@@ -0,0 +1,132 @@
+import time
+from collections import Counter
+
+import voyager.utils as U
+
+
+class TaskHistory:
+    """
+    Completed and failed tasks of the curriculum.
+    completed_tasks.json and failed_tasks.json keep their list format, next to them an ordered set of the
+    completed tasks and a counter of the failed ones give O(1) membership, and the joined strings shown in
+    the curriculum observation are maintained as tasks are recorded instead of being rebuilt every call.
+    task_attempts.json records per-task attempt counts and timestamps.
+    """
+
+    def __init__(self, ckpt_dir, resume=False):
+        U.f_mkdir(ckpt_dir)
+        self.completed_tasks_store = U.JournalStore(
+            f"{ckpt_dir}/completed_tasks.json", [], resume=resume
+        )
+        self.failed_tasks_store = U.JournalStore(
+            f"{ckpt_dir}/failed_tasks.json", [], resume=resume
+        )
+        self.attempts_store = U.JournalStore(
+            f"{ckpt_dir}/task_attempts.json", {}, resume=resume
+        )
+        self.completed_tasks = self.completed_tasks_store.data
+        self.failed_tasks = self.failed_tasks_store.data
+        self.attempts = self.attempts_store.data
+        self._rebuild()
+        # checkpoints written before task_attempts.json existed
+        for task in self.failed_tasks:
+            if task not in self.attempts:
+                self.attempts[task] = self._new_record(None)
+                self.attempts[task]["failures"] = self._failed[task]
+                self.attempts[task]["attempts"] = self._failed[task]
+        for task in self.completed_tasks:
+            if task not in self.attempts:
+                self.attempts[task] = self._new_record(None)
+                self.attempts[task]["successes"] = 1
+                self.attempts[task]["attempts"] = 1
+        self.attempts_store.compact()
+
+    def _rebuild(self):
+        # ordered set, dict keeps insertion order
+        self._completed = dict.fromkeys(self.completed_tasks)
+        self._failed = Counter(self.failed_tasks)
+        self._completed_text = ", ".join(self.completed_tasks)
+        self._failed_text = ", ".join(self.failed_tasks)
+
+    @staticmethod
+    def _new_record(now):
+        return {
+            "attempts": 0,
+            "successes": 0,
+            "failures": 0,
+            "first_attempt": now,
+            "last_attempt": now,
+        }
+
+    @staticmethod
+    def _join(text, task):
+        return f"{text}, {task}" if text else task
+
+    def is_completed(self, task):
+        return task in self._completed
+
+    def is_failed(self, task):
+        return task in self._failed
+
+    def failure_count(self, task):
+        return self._failed[task]
+
+    @property
+    def completed_text(self):
+        return self._completed_text or "None"
+
+    @property
+    def failed_text(self):
+        return self._failed_text or "None"
+
+    def _record_attempt(self, task, success):
+        now = time.time()
+        record = dict(self.attempts.get(task) or self._new_record(now))
+        if record["first_attempt"] is None:
+            record["first_attempt"] = now
+        record["last_attempt"] = now
+        record["attempts"] += 1
+        record["successes" if success else "failures"] += 1
+        self.attempts_store.set(task, record)
+
+    def add_completed(self, task):
+        self._record_attempt(task, True)
+        if task not in self._completed:
+            self.completed_tasks_store.append(task)
+            self._completed[task] = None
+            self._completed_text = self._join(self._completed_text, task)
+        # remove completed tasks from failed tasks
+        if task in self._failed:
+            self.failed_tasks_store.remove(task)
+            del self._failed[task]
+            self._failed_text = ", ".join(self.failed_tasks)
+
+    def add_failed(self, task):
+        self._record_attempt(task, False)
+        # record repeated failed tasks, unless the task was completed before
+        if task not in self._completed:
+            self.failed_tasks_store.append(task)
+            self._failed[task] += 1
+            self._failed_text = self._join(self._failed_text, task)
+
+    def clean_up(self):
+        # dedup but keep order, and remove completed tasks from failed tasks
+        completed = dict.fromkeys(self.completed_tasks)
+        self.completed_tasks[:] = list(completed)
+        self.failed_tasks[:] = [
+            task for task in self.failed_tasks if task not in completed
+        ]
+        self._rebuild()
+        self.compact()
+
+    def reset(self):
+        self.completed_tasks.clear()
+        self.failed_tasks.clear()
+        self.attempts.clear()
+        self._rebuild()
+        self.compact()
+
+    def compact(self):
+        self.completed_tasks_store.compact()
+        self.failed_tasks_store.compact()
+        self.attempts_store.compact()
@@ -0,0 +1,153 @@
+import re
+
+TASK_PATTERN = re.compile(
+    r"^(?P<verb>mine|craft|smelt|collect|obtain|gather|get|cook)\s+"
+    r"(?:(?P<quantity>\d+|a|an|one)\s+)?(?P<item>[a-z][a-z _-]*?)\.?$",
+    re.IGNORECASE,
+)
+QUANTITY_WORDS = {"a": 1, "an": 1, "one": 1}
+# item groups whose members all satisfy the task, e.g. "Mine 3 wood logs" accepts oak and spruce logs
+ITEM_GROUPS = {
+    "log": lambda name: name.endswith("_log") or name.endswith("_stem"),
+    "wood_log": lambda name: name.endswith("_log") or name.endswith("_stem"),
+    "wood": lambda name: name.endswith("_log") or name.endswith("_stem"),
+    "plank": lambda name: name.endswith("_planks"),
+    "wooden_plank": lambda name: name.endswith("_planks"),
+    "wood_plank": lambda name: name.endswith("_planks"),
+}
+# what mining a block puts into the inventory
+BLOCK_DROPS = {
+    "stone": "cobblestone",
+    "coal_ore": "coal",
+    "iron_ore": "raw_iron",
+    "gold_ore": "raw_gold",
+    "copper_ore": "raw_copper",
+    "diamond_ore": "diamond",
+    "emerald_ore": "emerald",
+    "lapis_ore": "lapis_lazuli",
+    "lapis_lazuli_ore": "lapis_lazuli",
+    "redstone_ore": "redstone",
+    "grass_block": "dirt",
+}
+# what cooking a food puts into the inventory
+COOKED_FOODS = {
+    "beef": "cooked_beef",
+    "raw_beef": "cooked_beef",
+    "porkchop": "cooked_porkchop",
+    "raw_porkchop": "cooked_porkchop",
+    "chicken": "cooked_chicken",
+    "raw_chicken": "cooked_chicken",
+    "mutton": "cooked_mutton",
+    "raw_mutton": "cooked_mutton",
+    "cod": "cooked_cod",
+    "raw_cod": "cooked_cod",
+    "salmon": "cooked_salmon",
+    "raw_salmon": "cooked_salmon",
+    "rabbit": "cooked_rabbit",
+    "raw_rabbit": "cooked_rabbit",
+    "potato": "baked_potato",
+    "potatoes": "baked_potato",
+    "kelp": "dried_kelp",
+}
+EXPLORATION_FAILURES = [
+    "max exploration time reached",
+    "could not find",
+    "timeout",
+    "path not found",
+]
+
+
+def _singular(name):
+    if name.endswith("ies"):
+        return name[:-3] + "y"
+    if name.endswith("es") and name[:-2].endswith(("sh", "ch", "x")):
+        return name[:-2]
+    if name.endswith("s") and not name.endswith("ss"):
+        return name[:-1]
+    return name
+
+
+def parse_task(task):
+    """
+    :return: (verb, quantity, item name in inventory format) for "Mine 3 wood logs" like tasks, None otherwise
+    """
+    match = TASK_PATTERN.match(task.strip())
+    if match is None:
+        return None
+    quantity = match.group("quantity") or "1"
+    quantity = QUANTITY_WORDS.get(quantity.lower()) or int(quantity)
+    item = re.sub(r"[\s-]+", "_", match.group("item").strip().lower())
+    return match.group("verb").lower(), quantity, item
+
+
+def item_matcher(verb, item):
+    """
+    :return: (predicate over inventory item names, whether the item was recognized), None if no predicate is
+    reliable. An unrecognized item is matched by its exact name, which can confirm a success but cannot rule
+    it out, e.g. "Obtain a bed" is satisfied by a red_bed.
+    """
+    candidates = [item, _singular(item)]
+    for candidate in candidates:
+        if candidate in ITEM_GROUPS:
+            return ITEM_GROUPS[candidate], True
+    if verb == "mine":
+        for candidate in candidates:
+            if candidate.startswith("deepslate_"):
+                candidate = candidate[len("deepslate_") :]
+            if candidate in BLOCK_DROPS:
+                drop = BLOCK_DROPS[candidate]
+                return (lambda name: name == drop), True
+    if verb == "cook":
+        # "Cook 1 beef" names the input, only its cooked product counts
+        for candidate in candidates:
+            if candidate.startswith(("cooked_", "baked_", "dried_")):
+                return (lambda name: name == candidate), False
+            if candidate in COOKED_FOODS:
+                product = COOKED_FOODS[candidate]
+                return (lambda name: name == product), True
+        return None
+    if verb == "smelt" and not item.endswith(("ingot", "ingots")):
+        # "Smelt 3 raw iron" names the input, the product is not spelled out
+        return None
+    names = set(candidates)
+    return (lambda name: name in names), False
+
+
+def check_task_rules(task, events, initial_inventory=None):
+    """
+    Decide mine / craft / smelt / collect tasks from the inventory without asking the LLM.
+    :return: (success, critique) when the outcome is certain, None when the critic LLM has to judge
+    """
+    parsed = parse_task(task)
+    if parsed is None:
+        return None
+    verb, quantity, item = parsed
+    matched = item_matcher(verb, item)
+    if matched is None:
+        return None
+    matcher, recognized = matched
+    inventory = events[-1][1]["inventory"]
+    count = sum(n for name, n in inventory.items() if matcher(name))
+    if count >= quantity:
+        return True, ""
+    if not recognized:
+        # the item may be in the inventory under another name
+        return None
+    errors = [event["onError"] for event_type, event in events if event_type == "onError"]
+    chats = [event["onChat"] for event_type, event in events if event_type == "onChat"]
+    unchanged = initial_inventory is not None and initial_inventory == inventory
+    if not errors or not unchanged:
+        # no error, or progress was made despite one, the LLM critique is more useful
+        return None
+    logs = " ".join(chats + errors).lower()
+    if any(failure in logs for failure in EXPLORATION_FAILURES):
+        critique = (
+            "Resource not found in this area. Exploration failed. "
+            "Try moving to a new area or biome."
+        )
+    else:
+        critique = f"Execution error: {errors[-1]}"
+    if not critique.endswith("."):
+        critique += "."
+    critique += f" You have {count} of the {quantity} {item.replace('_', ' ')} needed."
+    return False, critique
@@ -7,6 +7,7 @@ async function craftItem(bot, name, count = 1) {
     if (typeof count !== "number") {
         throw new Error("count for craftItem must be a number");
     }
+    cancelToken.throwIfCancelled();
     const itemByName = mcData.itemsByName[name];
     if (!itemByName) {
         throw new Error(`No item named ${name}`);
@@ -22,6 +23,7 @@ async function craftItem(bot, name, count = 1) {
             new GoalLookAtBlock(craftingTable.position, bot.world)
         );
     }
+    cancelToken.throwIfCancelled();
     const recipe = bot.recipesFor(itemByName.id, null, 1, craftingTable)[0];
     if (recipe) {
         bot.chat(`I can make ${name}`);
@@ -29,6 +31,7 @@ async function craftItem(bot, name, count = 1) {
             await bot.craft(recipe, count, craftingTable);
             bot.chat(`I did the recipe for ${name} ${count} times`);
         } catch (err) {
+            cancelToken.throwIfCancelled();
             bot.chat(`I cannot do the recipe for ${name} ${count} times`);
         }
     } else {
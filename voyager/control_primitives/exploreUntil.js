@@ -13,6 +13,7 @@ async function exploreUntil(
     if (typeof callback !== "function") {
         throw new Error("callback must be a function");
     }
+    cancelToken.throwIfCancelled();
     const test = callback();
     if (test) {
         bot.chat("Explore success.");
@@ -48,6 +49,11 @@ async function exploreUntil(
         };
 
         const explore = () => {
+            if (cancelToken.cancelled) {
+                cleanUp();
+                reject(cancelToken.error);
+                return;
+            }
             const x =
                 bot.entity.position.x +
                 Math.floor(Math.random() * 20 + 10) * dx;
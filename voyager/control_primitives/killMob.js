@@ -8,6 +8,7 @@ async function killMob(bot, mobName, timeout = 300) {
         throw new Error(`timeout for killMob must be a number`);
     }
 
+    cancelToken.throwIfCancelled();
     const weaponsForShooting = [
         "bow",
         "crossbow",
@@ -44,6 +45,7 @@ async function killMob(bot, mobName, timeout = 300) {
         await bot.pvp.attack(entity);
         droppedItem = await waitForMobRemoved(bot, entity, timeout);
     }
+    cancelToken.throwIfCancelled();
     if (droppedItem) {
         await bot.collectBlock.collect(droppedItem, { ignoreNoPath: true });
     }
@@ -6,6 +6,7 @@ async function mineBlock(bot, name, count = 1) {
     if (typeof count !== "number") {
         throw new Error(`count for mineBlock must be a number`);
     }
+    cancelToken.throwIfCancelled();
     const blockByName = mcData.blocksByName[name];
     if (!blockByName) {
         throw new Error(`No block named ${name}`);
@@ -33,5 +34,6 @@ async function mineBlock(bot, name, count = 1) {
         ignoreNoPath: true,
         count: count,
     });
+    cancelToken.throwIfCancelled();
     bot.save(`${name}_mined`);
 }
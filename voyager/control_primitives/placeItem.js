@@ -7,6 +7,7 @@ async function placeItem(bot, name, position) {
     if (!(position instanceof Vec3)) {
         throw new Error(`position for placeItem must be a Vec3`);
     }
+    cancelToken.throwIfCancelled();
     const itemByName = mcData.itemsByName[name];
     if (!itemByName) {
         throw new Error(`No item named ${name}`);
@@ -60,6 +61,7 @@ async function placeItem(bot, name, position) {
         bot.chat(`Placed ${name}`);
         bot.save(`${name}_placed`);
     } catch (err) {
+        cancelToken.throwIfCancelled();
         const item = bot.inventory.findInventoryItem(itemByName.id);
         if (item?.count === item_count) {
             bot.chat(
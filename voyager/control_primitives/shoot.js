@@ -14,6 +14,7 @@ async function shoot(bot, weapon, target) {
         return;
     }
 
+    cancelToken.throwIfCancelled();
     const weaponItem = mcData.itemsByName[weapon];
     if (!bot.inventory.findInventoryItem(weaponItem.id, null)) {
         bot.chat(`No ${weapon} in inventory for shooting`);
@@ -7,6 +7,7 @@ async function smeltItem(bot, itemName, fuelName, count = 1) {
     if (typeof count !== "number") {
         throw new Error("count for smeltItem must be a number");
     }
+    cancelToken.throwIfCancelled();
     const item = mcData.itemsByName[itemName];
     const fuel = mcData.itemsByName[fuelName];
     if (!item) {
@@ -29,6 +30,10 @@ async function smeltItem(bot, itemName, fuelName, count = 1) {
     const furnace = await bot.openFurnace(furnaceBlock);
     let success_count = 0;
     for (let i = 0; i < count; i++) {
+        if (cancelToken.cancelled) {
+            furnace.close();
+            cancelToken.throwIfCancelled();
+        }
         if (!bot.inventory.findInventoryItem(item.id, null)) {
             bot.chat(`No ${itemName} to smelt in inventory`);
             break;
@@ -8,6 +8,7 @@ async function getItemFromChest(bot, chestPosition, itemsToGet) {
     const chestBlock = bot.blockAt(chestPosition);
     const chest = await bot.openContainer(chestBlock);
     for (const name in itemsToGet) {
+        cancelToken.throwIfCancelled();
         const itemByName = mcData.itemsByName[name];
         if (!itemByName) {
             bot.chat(`No item named ${name}`);
@@ -39,6 +40,7 @@ async function depositItemIntoChest(bot, chestPosition, itemsToDeposit) {
     const chestBlock = bot.blockAt(chestPosition);
     const chest = await bot.openContainer(chestBlock);
     for (const name in itemsToDeposit) {
+        cancelToken.throwIfCancelled();
         const itemByName = mcData.itemsByName[name];
         if (!itemByName) {
             bot.chat(`No item named ${name}`);
@@ -77,6 +79,7 @@ async function moveToChest(bot, chestPosition) {
             "chestPosition for depositItemIntoChest must be a Vec3"
         );
     }
+    cancelToken.throwIfCancelled();
     if (chestPosition.distanceTo(bot.entity.position) > 32) {
         bot.chat(
             `/tp ${chestPosition.x} ${chestPosition.y} ${chestPosition.z}`
@@ -1 +1,3 @@
 from .bridge import VoyagerEnv
+from .async_bridge import AsyncVoyagerEnv
+from .stream import RepeatedMessageAbort, StepStream, AsyncStepStream
@@ -0,0 +1,248 @@
+import asyncio
+from typing import SupportsFloat, Any, Tuple, Dict, Sequence, Union
+
+import aiohttp
+from gymnasium.core import ObsType
+
+from .bridge import VoyagerEnv
+from .stream import AsyncStepStream
+from .wire import WIRE_HEADER, decode_events
+
+
+class AsyncVoyagerEnv(VoyagerEnv):
+    """
+    asyncio counterpart of VoyagerEnv.
+    step, reset, pause, unpause and close are coroutines, so a single Python process
+    can drive many bots on one event loop instead of holding one process per bot.
+    Process management (mineflayer / minecraft launch) is still blocking and runs in a worker thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = None
+        self._num_requests = 0
+        self._connections_opened = 0
+        self._connections_reused = 0
+
+    def _get_client(self):
+        # aiohttp sessions are bound to the running loop, so create it lazily
+        if self.client is None or self.client.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_create)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+            self.client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.session.pool_maxsize),
+                trace_configs=[trace_config],
+            )
+        return self.client
+
+    async def _on_connection_create(self, session, ctx, params):
+        self._connections_opened += 1
+
+    async def _on_connection_reuse(self, session, ctx, params):
+        self._connections_reused += 1
+
+    async def _post(self, endpoint, json=None, observation=False):
+        """
+        :param observation: decode the response as observation events instead of plain JSON
+        """
+        client = self._get_client()
+        timeout = aiohttp.ClientTimeout(total=self.session.timeout(endpoint))
+        attempt = 0
+        while True:
+            self._num_requests += 1
+            try:
+                async with client.post(
+                    f"{self.server}/{endpoint}", json=json, timeout=timeout
+                ) as res:
+                    if res.status != 200:
+                        return res.status, await res.text()
+                    if observation:
+                        return res.status, decode_events(
+                            res.headers.get("Content-Type"),
+                            res.headers.get(WIRE_HEADER),
+                            await res.read(),
+                            decoder=self.delta_decoder,
+                        )
+                    return res.status, await res.json()
+            except aiohttp.ClientConnectorError:
+                # only connection errors are retried, same as the sync session
+                if attempt >= self.session.max_retries:
+                    raise
+                await asyncio.sleep(self.session.retry_backoff * (2**attempt))
+                attempt += 1
+
+    @property
+    def connection_stats(self):
+        return {
+            "requests": self._num_requests,
+            "connections_opened": self._connections_opened,
+            "connections_reused": self._connections_reused,
+        }
+
+    async def check_process(self):
+        if self.mc_instance and not self.mc_instance.is_running:
+            print("Starting Minecraft server")
+            await asyncio.to_thread(self.mc_instance.run)
+            self.mc_port = self.mc_instance.port
+            self.reset_options["port"] = self.mc_instance.port
+            print(f"Server started on port {self.reset_options['port']}")
+        retry = 0
+        while not self.mineflayer.is_running:
+            print("Mineflayer process has exited, restarting")
+            if self.client is not None:
+                await self.client.close()
+                self.client = None
+            self.program_registry.clear()
+            await asyncio.to_thread(self.mineflayer.run)
+            if not self.mineflayer.is_running:
+                retry += 1
+                if retry > 3:
+                    raise RuntimeError("Mineflayer process failed to start")
+                else:
+                    continue
+            print(self.mineflayer.ready_line)
+            self.delta_decoder.reset()
+            status, returned_data = await self._post(
+                "start", json=self.reset_options, observation=True
+            )
+            if status != 200:
+                await asyncio.to_thread(self.mineflayer.stop)
+                raise RuntimeError(f"Minecraft server reply with code {status}")
+            return returned_data
+
+    async def upload_programs(self, programs):
+        hashes, missing = self.program_registry.prepare(programs)
+        if missing:
+            status, _ = await self._post("programs", json={"programs": missing})
+            if status != 200:
+                raise RuntimeError("Failed to upload programs to Minecraft server")
+            self.program_registry.mark_uploaded(
+                missing.keys(), version=getattr(programs, "version", None)
+            )
+        return hashes
+
+    async def step(
+        self,
+        code: str,
+        programs: Union[str, Sequence[str]] = "",
+        abort_policy=None,
+    ) -> Tuple[ObsType, SupportsFloat, bool, bool, Dict[str, Any]]:
+        if abort_policy is not None:
+            abort_policy.reset()
+            stream = await self.step_stream(code, programs)
+            async for event_type, event in stream:
+                if abort_policy(event_type, event):
+                    print(
+                        f"\033[31mAborting the step after {event_type}: {event[event_type]}\033[0m"
+                    )
+                    return await stream.abort()
+            return stream.events
+        return await self._post_step(code, programs)
+
+    async def step_stream(
+        self,
+        code: str,
+        programs: Union[str, Sequence[str]] = "",
+    ) -> AsyncStepStream:
+        return AsyncStepStream(self, await self._post_step(code, programs, stream=True))
+
+    async def _open_stream(self, data):
+        client = self._get_client()
+        # bound every read instead of the whole step
+        timeout = aiohttp.ClientTimeout(
+            total=None, sock_read=self.session.timeout("step")
+        )
+        self._num_requests += 1
+        res = await client.post(f"{self.server}/step", json=data, timeout=timeout)
+        if res.status != 200:
+            text = await res.text()
+            res.release()
+            return res.status, text
+        return res.status, res
+
+    async def _post_step(self, code, programs, stream=False):
+        if not self.has_reset:
+            raise RuntimeError("Environment has not been reset yet")
+        await self.check_process()
+        await self.unpause()
+        data = {
+            "code": code,
+            "ack": self.delta_decoder.seq,
+            "stream": stream,
+            "tick_budget": self.step_tick_budget,
+        }
+        if isinstance(programs, str):
+            data["programs"] = programs
+        else:
+            data["program_hashes"] = await self.upload_programs(programs)
+        if stream:
+            status, returned_data = await self._open_stream(data)
+        else:
+            status, returned_data = await self._post("step", json=data, observation=True)
+        if status == 409:
+            self.program_registry.clear()
+            data["program_hashes"] = await self.upload_programs(programs)
+            if stream:
+                status, returned_data = await self._open_stream(data)
+            else:
+                status, returned_data = await self._post(
+                    "step", json=data, observation=True
+                )
+        if status != 200:
+            raise RuntimeError("Failed to step Minecraft server")
+        return returned_data
+
+    async def cancel(self, reason="cancelled by the client"):
+        status, returned_data = await self._post("cancel", json={"reason": reason})
+        return status == 200 and returned_data["cancelled"]
+
+    async def reset(
+        self,
+        *,
+        seed=None,
+        options=None,
+    ) -> Tuple[ObsType, Dict[str, Any]]:
+        self.reset_options = self.build_reset_options(options)
+
+        await self.unpause()
+        await asyncio.to_thread(self.mineflayer.stop)
+        await asyncio.sleep(1)  # wait for mineflayer to exit
+
+        returned_data = await self.check_process()
+        self.has_reset = True
+        self.connected = True
+        # All the reset in step will be soft
+        self.reset_options["reset"] = "soft"
+        return returned_data
+
+    async def close(self):
+        await self.unpause()
+        if self.connected:
+            status, _ = await self._post("stop")
+            if status == 200:
+                self.connected = False
+        if self.mc_instance:
+            await asyncio.to_thread(self.mc_instance.stop)
+        await asyncio.to_thread(self.mineflayer.stop)
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+        self.session.close()
+        return not self.connected
+
+    async def pause(self):
+        if self.mineflayer.is_running and not self.server_paused:
+            status, _ = await self._post("pause")
+            if status == 200:
+                self.server_paused = True
+        return self.server_paused
+
+    async def unpause(self):
+        if self.mineflayer.is_running and self.server_paused:
+            status, returned_data = await self._post("pause")
+            if status == 200:
+                self.server_paused = False
+            else:
+                print(returned_data)
+        return self.server_paused
@@ -1,10 +1,7 @@
 import os.path
 import time
 import warnings
-from typing import SupportsFloat, Any, Tuple, Dict
-
-import requests
-import json
+from typing import SupportsFloat, Any, Tuple, Dict, Sequence, Union
 
 import gymnasium as gym
 from gymnasium.core import ObsType
@@ -13,6 +10,10 @@ import voyager.utils as U
 
 from .minecraft_launcher import MinecraftInstance
 from .process_monitor import SubprocessMonitor
+from .program_registry import ProgramRegistry
+from .session import BridgeSession
+from .stream import StepStream
+from .wire import WIRE_HEADER, DeltaDecoder, Events, decode_events, wire_request
 
 
 class VoyagerEnv(gym.Env):
@@ -25,7 +26,21 @@ class VoyagerEnv(gym.Env):
         request_timeout=600,
         bot_name="VoyagerBot",
         log_path="./logs",
+        pool_maxsize=4,
+        max_retries=3,
+        retry_backoff=0.5,
+        endpoint_timeouts=None,
+        wire_encoding=None,
+        delta_observations=False,
+        step_tick_budget=None,
     ):
+        """
+        :param wire_encoding: encoding of the observations sent by mineflayer, "json" or "msgpack",
+        None for the most compact one available
+        :param delta_observations: have mineflayer send only the fields that changed since the last
+        observation, the complete events are rebuilt here
+        :param step_tick_budget: cancel a step once its program ran for this many ticks, None for no limit
+        """
         if not mc_port and not azure_login:
             raise ValueError("Either mc_port or azure_login must be specified")
         if mc_port and azure_login:
@@ -39,6 +54,19 @@ class VoyagerEnv(gym.Env):
         self.request_timeout = request_timeout
         self.log_path = log_path
         self.bot_name = bot_name
+        # fail early if the requested encoding is not installed
+        self.wire = wire_request(wire_encoding, delta=delta_observations)
+        self.delta_decoder = DeltaDecoder()
+        self.step_tick_budget = step_tick_budget
+        self.session = BridgeSession(
+            self.server,
+            request_timeout=request_timeout,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            endpoint_timeouts=endpoint_timeouts,
+        )
+        self.program_registry = ProgramRegistry()
         self.mineflayer = self.get_mineflayer_process(server_port)
         if azure_login:
             self.mc_instance = self.get_mc_instance()
@@ -90,46 +118,117 @@ class VoyagerEnv(gym.Env):
         retry = 0
         while not self.mineflayer.is_running:
             print("Mineflayer process has exited, restarting")
+            # connections to the old process are dead and its program registry is gone
+            self.session.reset_pool()
+            self.program_registry.clear()
             self.mineflayer.run()
             if not self.mineflayer.is_running:
+                retry += 1
                 if retry > 3:
                     raise RuntimeError("Mineflayer process failed to start")
                 else:
                     continue
             print(self.mineflayer.ready_line)
-            res = requests.post(
-                f"{self.server}/start",
-                json=self.reset_options,
-                timeout=self.request_timeout,
-            )
+            self.delta_decoder.reset()
+            res = self.session.post("start", json=self.reset_options)
             if res.status_code != 200:
                 self.mineflayer.stop()
                 raise RuntimeError(
                     f"Minecraft server reply with code {res.status_code}"
                 )
-            return res.json()
+            return self.decode_events(res)
+
+    def decode_events(self, res) -> Events:
+        return decode_events(
+            res.headers.get("Content-Type"),
+            res.headers.get(WIRE_HEADER),
+            res.content,
+            decoder=self.delta_decoder,
+        )
+
+    def upload_programs(self, programs):
+        hashes, missing = self.program_registry.prepare(programs)
+        if missing:
+            res = self.session.post("programs", json={"programs": missing})
+            if res.status_code != 200:
+                raise RuntimeError("Failed to upload programs to Minecraft server")
+            self.program_registry.mark_uploaded(
+                missing.keys(), version=getattr(programs, "version", None)
+            )
+        return hashes
 
     def step(
         self,
         code: str,
-        programs: str = "",
+        programs: Union[str, Sequence[str]] = "",
+        abort_policy=None,
     ) -> Tuple[ObsType, SupportsFloat, bool, bool, Dict[str, Any]]:
+        """
+        :param programs: either the concatenated program source, sent inline with the request,
+        or a list of program sources, which are uploaded once and then referenced by hash
+        :param abort_policy: called with every [event_type, event] streamed while the program runs,
+        the step is aborted as soon as it returns True, see RepeatedMessageAbort
+        """
+        if abort_policy is not None:
+            abort_policy.reset()
+            stream = self.step_stream(code, programs)
+            for event_type, event in stream:
+                if abort_policy(event_type, event):
+                    print(
+                        f"\033[31mAborting the step after {event_type}: {event[event_type]}\033[0m"
+                    )
+                    return stream.abort()
+            return stream.events
+        res = self._post_step(code, programs)
+        # self.pause()
+        return self.decode_events(res)
+
+    def step_stream(
+        self,
+        code: str,
+        programs: Union[str, Sequence[str]] = "",
+    ) -> StepStream:
+        """
+        Like step, but the events are yielded while the program runs.
+        """
+        return StepStream(self, self._post_step(code, programs, stream=True))
+
+    def _post_step(self, code, programs, stream=False):
         if not self.has_reset:
             raise RuntimeError("Environment has not been reset yet")
         self.check_process()
         self.unpause()
         data = {
             "code": code,
-            "programs": programs,
+            "ack": self.delta_decoder.seq,
+            "stream": stream,
+            "tick_budget": self.step_tick_budget,
         }
-        res = requests.post(
-            f"{self.server}/step", json=data, timeout=self.request_timeout
-        )
+        if isinstance(programs, str):
+            data["programs"] = programs
+        else:
+            data["program_hashes"] = self.upload_programs(programs)
+        res = self.session.post("step", json=data, stream=stream)
+        if res.status_code == 409:
+            # mineflayer lost some programs, e.g. it was restarted behind our back
+            self.program_registry.clear()
+            data["program_hashes"] = self.upload_programs(programs)
+            res = self.session.post("step", json=data, stream=stream)
         if res.status_code != 200:
             raise RuntimeError("Failed to step Minecraft server")
-        returned_data = res.json()
-        # self.pause()
-        return json.loads(returned_data)
+        return res
+
+    def cancel(self, reason="cancelled by the client"):
+        """
+        Cancel the running step, its request then returns with a "Step cancelled" error event.
+        :return: whether a step was running
+        """
+        res = self.session.post("cancel", json={"reason": reason})
+        return res.status_code == 200 and res.json()["cancelled"]
+
+    @property
+    def connection_stats(self):
+        return self.session.stats
 
     def render(self):
         raise NotImplementedError("render is not implemented")
@@ -140,13 +239,28 @@ class VoyagerEnv(gym.Env):
         seed=None,
         options=None,
     ) -> Tuple[ObsType, Dict[str, Any]]:
+        self.reset_options = self.build_reset_options(options)
+
+        self.unpause()
+        self.mineflayer.stop()
+        time.sleep(1)  # wait for mineflayer to exit
+
+        returned_data = self.check_process()
+        self.has_reset = True
+        self.connected = True
+        # All the reset in step will be soft
+        self.reset_options["reset"] = "soft"
+        # self.pause()
+        return returned_data
+
+    def build_reset_options(self, options=None):
         if options is None:
             options = {}
 
         if options.get("inventory", {}) and options.get("mode", "hard") != "hard":
             raise RuntimeError("inventory can only be set when options is hard")
 
-        self.reset_options = {
+        return {
             "port": self.mc_port,
             "bot_name": self.bot_name,
             "reset": options.get("mode", "hard"),
@@ -155,41 +269,31 @@ class VoyagerEnv(gym.Env):
             "spread": options.get("spread", False),
             "waitTicks": options.get("wait_ticks", 5),
             "position": options.get("position", None),
+            "wire": self.wire,
         }
 
-        self.unpause()
-        self.mineflayer.stop()
-        time.sleep(1)  # wait for mineflayer to exit
-
-        returned_data = self.check_process()
-        self.has_reset = True
-        self.connected = True
-        # All the reset in step will be soft
-        self.reset_options["reset"] = "soft"
-        # self.pause()
-        return json.loads(returned_data)
-
     def close(self):
         self.unpause()
         if self.connected:
-            res = requests.post(f"{self.server}/stop")
+            res = self.session.post("stop")
             if res.status_code == 200:
                 self.connected = False
         if self.mc_instance:
             self.mc_instance.stop()
         self.mineflayer.stop()
+        self.session.close()
         return not self.connected
 
     def pause(self):
         if self.mineflayer.is_running and not self.server_paused:
-            res = requests.post(f"{self.server}/pause")
+            res = self.session.post("pause")
             if res.status_code == 200:
                 self.server_paused = True
         return self.server_paused
 
     def unpause(self):
         if self.mineflayer.is_running and self.server_paused:
-            res = requests.post(f"{self.server}/pause")
+            res = self.session.post("pause")
             if res.status_code == 200:
                 self.server_paused = False
             else:
@@ -4,6 +4,7 @@ const bodyParser = require("body-parser");
 const mineflayer = require("mineflayer");
 
 const skills = require("./lib/skillLoader");
+const cancel = require("./lib/cancel");
 const { initCounter, getNextTime } = require("./lib/utils");
 const obs = require("./lib/observation/base");
 const OnChat = require("./lib/observation/onChat");
@@ -15,8 +16,157 @@ const OnSave = require("./lib/observation/onSave");
 const Chests = require("./lib/observation/chests");
 const { plugin: tool } = require("mineflayer-tool");
 
+// optional, observations are sent as JSON without it
+let msgpack = null;
+try {
+    msgpack = require("@msgpack/msgpack");
+} catch (e) {
+    msgpack = null;
+}
+
 let bot = null;
 
+// Wire format of the observations, negotiated on /start.
+// Version 1 sends the observation as a JSON string inside JSON, for clients that do not offer a format.
+// Version 2 sends the observation itself, JSON or msgpack encoded, and says so in the X-Voyager-Wire header.
+let wireFormat = { version: 1, encoding: "json", delta: false };
+
+// Delta observations (version 2, opt-in): every event only carries the fields that changed since the
+// previous event, the first one relative to the last event of the response the client acknowledged.
+// The reply is an envelope { seq, base, events }, base is null when the events are complete.
+let deltaState = { seq: 0, baseline: null };
+
+function negotiateWire(offer) {
+    if (!offer || !(offer.version >= 2)) {
+        return { version: 1, encoding: "json", delta: false };
+    }
+    const encodings = offer.encodings || ["json"];
+    const encoding =
+        encodings.find(
+            (e) => e === "json" || (e === "msgpack" && msgpack !== null)
+        ) || "json";
+    return { version: 2, encoding: encoding, delta: !!offer.delta };
+}
+
+function encodeDelta(observation, ack) {
+    const useBaseline = deltaState.baseline !== null && ack === deltaState.seq;
+    // field name -> JSON of the field in the previous event, "on*" fields belong to a single event
+    let baseline = useBaseline ? deltaState.baseline : {};
+    const events = observation.map(([eventName, data]) => {
+        const delta = {};
+        const next = {};
+        for (const key in data) {
+            if (key.startsWith("on")) {
+                delta[key] = data[key];
+                continue;
+            }
+            next[key] = JSON.stringify(data[key]);
+            if (baseline[key] !== next[key]) {
+                delta[key] = data[key];
+            }
+        }
+        baseline = next;
+        return [eventName, delta];
+    });
+    const base = useBaseline ? deltaState.seq : null;
+    deltaState = { seq: deltaState.seq + 1, baseline: baseline };
+    return { seq: deltaState.seq, base: base, events: events };
+}
+
+function prepareObservation(req, observation) {
+    return wireFormat.delta ? encodeDelta(observation, req.body.ack) : observation;
+}
+
+function sendObservation(req, res, observation) {
+    if (wireFormat.version < 2) {
+        res.json(JSON.stringify(observation));
+        return;
+    }
+    let header = `${wireFormat.version}; encoding=${wireFormat.encoding}`;
+    observation = prepareObservation(req, observation);
+    if (wireFormat.delta) {
+        header += "; delta";
+    }
+    res.set("X-Voyager-Wire", header);
+    if (wireFormat.encoding === "msgpack") {
+        const body = msgpack.encode(observation, { ignoreUndefined: true });
+        res.type("application/msgpack").send(
+            Buffer.from(body.buffer, body.byteOffset, body.byteLength)
+        );
+    } else {
+        res.json(observation);
+    }
+}
+
+// Program sources uploaded by the python side, keyed by content hash. They outlive bot restarts.
+const programRegistry = new Map();
+// Compiled program bundles keyed by the ordered list of program hashes.
+const compiledBundles = new Map();
+const MAX_COMPILED_BUNDLES = 16;
+// Per-step variables that programs and the executed code can refer to.
+const STEP_SCOPE_NAMES = [
+    "mcData",
+    "Movements",
+    "Goal",
+    "GoalBlock",
+    "GoalNear",
+    "GoalXZ",
+    "GoalNearXZ",
+    "GoalY",
+    "GoalGetToBlock",
+    "GoalLookAtBlock",
+    "GoalBreakBlock",
+    "GoalCompositeAny",
+    "GoalCompositeAll",
+    "GoalInvert",
+    "GoalFollow",
+    "GoalPlaceBlock",
+    "pathfinder",
+    "Move",
+    "ComputedPath",
+    "PartiallyComputedPath",
+    "XZCoordinates",
+    "XYZCoordinates",
+    "SafeBlock",
+    "GoalPlaceBlockOptions",
+    "Vec3",
+    "movements",
+    "_craftItemFailCount",
+    "_killMobFailCount",
+    "_mineBlockFailCount",
+    "_placeItemFailCount",
+    "_smeltItemFailCount",
+    "cancelToken",
+];
+
+// Parse the programs once and return a factory binding them to a step scope.
+// Programs start on the first line of the compiled source and the executed code is padded
+// so that it starts right after them, which keeps the line numbers used by handleError intact.
+function compileBundle(programs) {
+    return eval(
+        "(function (__scope) { let { " +
+            STEP_SCOPE_NAMES.join(", ") +
+            " } = __scope; return (function () {" +
+            programs +
+            '\nreturn (code) => eval("(async () => {" + "\\n".repeat(__scope.programsLength) + code + "\\n})()"); })(); })'
+    );
+}
+
+function getCompiledBundle(key, programs) {
+    let factory = compiledBundles.get(key);
+    if (factory) {
+        // refresh recency
+        compiledBundles.delete(key);
+    } else {
+        factory = compileBundle(programs);
+        if (compiledBundles.size >= MAX_COMPILED_BUNDLES) {
+            compiledBundles.delete(compiledBundles.keys().next().value);
+        }
+    }
+    compiledBundles.set(key, factory);
+    return factory;
+}
+
 const app = express();
 
 app.use(bodyParser.json({ limit: "50mb" }));
@@ -34,6 +184,8 @@ app.post("/start", (req, res) => {
     if (bot) onDisconnect("Restarting bot");
     bot = null;
     console.log(req.body);
+    wireFormat = negotiateWire(req.body.wire);
+    deltaState = { seq: 0, baseline: null };
     bot = mineflayer.createBot({
         host: "localhost", // minecraft server ip
         port: req.body.port, // minecraft server port
@@ -138,6 +290,7 @@ app.post("/start", (req, res) => {
             BlockRecords,
         ]);
         skills.inject(bot);
+        cancel.inject(bot);
 
         if (req.body.spread) {
             bot.chat(`/spreadplayers ~ ~ 0 300 under 80 false @s`);
@@ -145,7 +298,7 @@ app.post("/start", (req, res) => {
         }
 
         await bot.waitForTicks(bot.waitTicks * itemTicks);
-        res.json(bot.observe());
+        sendObservation(req, res, bot.observe());
 
         initCounter(bot);
         bot.chat("/gamerule keepInventory true");
@@ -167,16 +320,88 @@ app.post("/start", (req, res) => {
     }
 });
 
-app.post("/step", async (req, res) => {
-    // import useful package
+app.post("/programs", (req, res) => {
+    const programs = req.body.programs || {};
+    for (const hash in programs) {
+        programRegistry.set(hash, programs[hash]);
+    }
+    res.json({ registered: Object.keys(programs).length });
+});
+
+// Steps run one at a time, a step sent while an aborted one is still winding down waits for it.
+let stepQueue = Promise.resolve();
+
+app.post("/step", (req, res) => {
+    const run = stepQueue.then(() => runStep(req, res));
+    stepQueue = run.catch((err) => console.log(err));
+});
+
+// With req.body.stream the reply is NDJSON: {type: "event", name, data} for every onChat / onError / onSave
+// event as it happens, then {type: "observation", delta, observation} with the complete observation.
+// Closing the connection before the observation cancels the step.
+// req.body.tick_budget cancels the step once the program ran for that many physics ticks.
+async function runStep(req, res) {
+    const programHashes = req.body.program_hashes;
+    if (programHashes) {
+        const missing = programHashes.filter((h) => !programRegistry.has(h));
+        if (missing.length > 0) {
+            res.status(409).json({ missing: missing });
+            return;
+        }
+    }
+    const streaming = !!req.body.stream;
+    const tickBudget = req.body.tick_budget;
+    const cancelToken = new cancel.CancelToken();
+    bot.cancelToken = cancelToken;
     let response_sent = false;
+    res.on("close", () => {
+        if (!response_sent) {
+            response_sent = true;
+            bot.eventListener = null;
+            bot.cancelStep("the client disconnected");
+        }
+    });
+    if (streaming) {
+        res.status(200);
+        res.set("Content-Type", "application/x-ndjson");
+        res.flushHeaders();
+        bot.eventListener = (eventName, data) => {
+            if (!eventName.startsWith("on") || response_sent) return;
+            res.write(
+                JSON.stringify({
+                    type: "event",
+                    name: eventName,
+                    data: { [eventName]: data[eventName] },
+                }) + "\n"
+            );
+        };
+    }
+
+    function respond() {
+        const observation = bot.observe();
+        if (response_sent) return;
+        response_sent = true;
+        if (streaming) {
+            bot.eventListener = null;
+            res.end(
+                JSON.stringify({
+                    type: "observation",
+                    delta: wireFormat.delta,
+                    observation: prepareObservation(req, observation),
+                }) + "\n"
+            );
+        } else {
+            sendObservation(req, res, observation);
+        }
+    }
+
+    // import useful package
     function otherError(err) {
         console.log("Uncaught Error");
         bot.emit("error", handleError(err));
         bot.waitForTicks(bot.waitTicks).then(() => {
             if (!response_sent) {
-                response_sent = true;
-                res.json(bot.observe());
+                respond();
             }
         });
     }
@@ -231,6 +456,9 @@ app.post("/step", async (req, res) => {
 
     function onTick() {
         bot.globalTickCounter++;
+        if (tickBudget && bot.globalTickCounter >= tickBudget) {
+            bot.cancelStep(`the step ran out of its ${tickBudget} ticks`);
+        }
         if (bot.pathfinder.isMoving()) {
             bot.stuckTickCounter++;
             if (bot.stuckTickCounter >= 100) {
@@ -251,11 +479,14 @@ app.post("/step", async (req, res) => {
 
     // Retrieve array form post bod
     const code = req.body.code;
-    const programs = req.body.programs;
+    const programs = programHashes
+        ? programHashes.map((h) => programRegistry.get(h) + "\n\n").join("")
+        : req.body.programs;
     bot.cumulativeObs = [];
     await bot.waitForTicks(bot.waitTicks);
     const r = await evaluateCode(code, programs);
     process.off("uncaughtException", otherError);
+    bot.cancelToken = null;
     if (r !== "success") {
         bot.emit("error", handleError(r));
     }
@@ -263,15 +494,53 @@ app.post("/step", async (req, res) => {
     // wait for last message
     await bot.waitForTicks(bot.waitTicks);
     if (!response_sent) {
-        response_sent = true;
-        res.json(bot.observe());
+        respond();
     }
     bot.removeListener("physicTick", onTick);
 
     async function evaluateCode(code, programs) {
         // Echo the code produced for players to see it. Don't echo when the bot code is already producing dialog or it will double echo
         try {
-            await eval("(async () => {" + programs + "\n" + code + "})()");
+            const factory = programHashes
+                ? getCompiledBundle(programHashes.join(","), programs)
+                : compileBundle(programs);
+            const run = factory({
+                mcData,
+                Movements,
+                Goal,
+                GoalBlock,
+                GoalNear,
+                GoalXZ,
+                GoalNearXZ,
+                GoalY,
+                GoalGetToBlock,
+                GoalLookAtBlock,
+                GoalBreakBlock,
+                GoalCompositeAny,
+                GoalCompositeAll,
+                GoalInvert,
+                GoalFollow,
+                GoalPlaceBlock,
+                pathfinder,
+                Move,
+                ComputedPath,
+                PartiallyComputedPath,
+                XZCoordinates,
+                XYZCoordinates,
+                SafeBlock,
+                GoalPlaceBlockOptions,
+                Vec3,
+                movements,
+                _craftItemFailCount,
+                _killMobFailCount,
+                _mineBlockFailCount,
+                _placeItemFailCount,
+                _smeltItemFailCount,
+                cancelToken,
+                programsLength: programs.split("\n").length,
+            });
+            // a program ignoring the token is left behind, its next control primitive call fails
+            await Promise.race([run(code), cancelToken.promise]);
             return "success";
         } catch (err) {
             return err;
@@ -414,6 +683,13 @@ app.post("/step", async (req, res) => {
         }
         return err.message;
     }
+}
+
+app.post("/cancel", (req, res) => {
+    // cancelStep is only attached once the bot spawned
+    if (!bot || !bot.cancelStep) return res.json({ cancelled: false });
+    const reason = req.body.reason || "cancelled by the client";
+    res.json({ cancelled: bot.cancelStep(reason) });
 });
 
 app.post("/stop", (req, res) => {
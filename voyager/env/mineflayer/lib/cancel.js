@@ -0,0 +1,56 @@
+class StepCancelledError extends Error {
+    constructor(reason) {
+        super(`Step cancelled: ${reason}`);
+        this.name = "StepCancelledError";
+    }
+}
+
+// Cooperative cancellation of a step. The control primitives call throwIfCancelled between actions,
+// and promise rejects as soon as the step is cancelled so the step does not wait for programs that ignore it.
+class CancelToken {
+    constructor() {
+        this.cancelled = false;
+        this.error = null;
+        this.promise = new Promise((resolve, reject) => {
+            this._reject = reject;
+        });
+        // nobody may be racing against it
+        this.promise.catch(() => {});
+    }
+
+    cancel(reason) {
+        if (this.cancelled) return false;
+        this.cancelled = true;
+        this.error = new StepCancelledError(reason);
+        this._reject(this.error);
+        return true;
+    }
+
+    throwIfCancelled() {
+        if (this.cancelled) throw this.error;
+    }
+}
+
+function inject(bot) {
+    // token of the running step, null between steps
+    bot.cancelToken = null;
+    // Cancel the running step and interrupt what the bot is doing, pending pathfinding, digging,
+    // fighting and window operations then fail in the program.
+    bot.cancelStep = (reason) => {
+        if (!bot.cancelToken || !bot.cancelToken.cancel(reason)) return false;
+        console.log(`Step cancelled: ${reason}`);
+        try {
+            if (bot.pathfinder) bot.pathfinder.stop();
+            if (bot.pvp) bot.pvp.stop();
+            if (bot.hawkEye) bot.hawkEye.stop();
+            if (bot.currentWindow) bot.closeWindow(bot.currentWindow);
+            bot.stopDigging();
+            bot.clearControlStates();
+        } catch (err) {
+            console.log(err);
+        }
+        return true;
+    };
+}
+
+module.exports = { CancelToken, StepCancelledError, inject };
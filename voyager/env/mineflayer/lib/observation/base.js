@@ -21,6 +21,8 @@ function inject(bot, obs_list) {
     bot.obsList = [];
     bot.cumulativeObs = [];
     bot.eventMemory = {};
+    // called with every recorded event, e.g. to stream it while a step runs
+    bot.eventListener = null;
     obs_list.forEach((obs) => {
         bot.obsList.push(new obs(bot));
     });
@@ -33,12 +35,15 @@ function inject(bot, obs_list) {
             result[obs.name] = obs.observe();
         });
         bot.cumulativeObs.push([event_name, result]);
+        if (bot.eventListener) {
+            bot.eventListener(event_name, result);
+        }
     };
     bot.observe = function () {
         bot.event("observe");
         const result = bot.cumulativeObs;
         bot.cumulativeObs = [];
-        return JSON.stringify(result);
+        return result;
     };
 }
 
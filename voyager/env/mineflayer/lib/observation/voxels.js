@@ -18,13 +18,34 @@ class BlockRecords extends Observation {
         this.name = "blockRecords";
         this.records = new Set();
         this.tick = 0;
+        // the scan and inventory version last merged into the records, a merge is skipped if neither changed
+        this.mergedBlocks = null;
+        this.mergedInventory = -1;
+        this.inventoryItems = null;
+        this.inventoryVersion = 0;
+        bot.inventory.on("updateSlot", () => {
+            this.inventoryItems = null;
+            this.inventoryVersion++;
+        });
         bot.on("physicsTick", () => {
             this.tick++;
             if (this.tick >= 100) {
-                const items = getInventoryItems(this.bot);
-                getSurroundingBlocks(this.bot, 8, 2, 8).forEach((block) => {
-                    if (!items.has(block)) this.records.add(block);
-                });
+                const blocks = getSurroundingBlocks(this.bot, 8, 2, 8);
+                if (
+                    blocks !== this.mergedBlocks ||
+                    this.inventoryVersion !== this.mergedInventory
+                ) {
+                    if (!this.inventoryItems) {
+                        this.inventoryItems = getInventoryItems(this.bot);
+                    }
+                    blocks.forEach((block) => {
+                        if (!this.inventoryItems.has(block)) {
+                            this.records.add(block);
+                        }
+                    });
+                    this.mergedBlocks = blocks;
+                    this.mergedInventory = this.inventoryVersion;
+                }
                 this.tick = 0;
             }
         });
@@ -36,24 +57,102 @@ class BlockRecords extends Observation {
 
     reset() {
         this.records = new Set();
+        this.mergedBlocks = null;
     }
 }
 
-function getSurroundingBlocks(bot, x_distance, y_distance, z_distance) {
-    const surroundingBlocks = new Set();
+// Scans the blocks around the bot from the chunk columns, without building a Block per position,
+// and keeps the result until the bot moves to another block or a block in range changes.
+class VoxelScanner {
+    constructor(bot) {
+        this.bot = bot;
+        this.cache = new Map();
+        // state id -> block name, null for air
+        this.names = new Map();
+        // reused column lookup position, x and z are relative to the chunk
+        this.local = { x: 0, y: 0, z: 0 };
+        // reused chunk columns of the x row being scanned
+        this.columns = [];
+        bot.on("blockUpdate", (oldBlock, newBlock) => {
+            const block = newBlock || oldBlock;
+            if (block) this.invalidateAt(block.position);
+        });
+        bot.on("chunkColumnLoad", () => this.cache.clear());
+        bot.on("chunkColumnUnload", () => this.cache.clear());
+        bot.on("respawn", () => this.cache.clear());
+    }
+
+    invalidateAt(position) {
+        for (const [key, entry] of this.cache) {
+            if (
+                Math.abs(position.x - entry.x) <= entry.dx &&
+                Math.abs(position.y - entry.y) <= entry.dy &&
+                Math.abs(position.z - entry.z) <= entry.dz
+            ) {
+                this.cache.delete(key);
+            }
+        }
+    }
 
-    for (let x = -x_distance; x <= x_distance; x++) {
-        for (let y = -y_distance; y <= y_distance; y++) {
-            for (let z = -z_distance; z <= z_distance; z++) {
-                const block = bot.blockAt(bot.entity.position.offset(x, y, z));
-                if (block && block.type !== 0) {
-                    surroundingBlocks.add(block.name);
+    blockName(stateId) {
+        let name = this.names.get(stateId);
+        if (name === undefined) {
+            const block = this.bot.registry.blocksByStateId[stateId];
+            name = block && block.id !== 0 ? block.name : null;
+            this.names.set(stateId, name);
+        }
+        return name;
+    }
+
+    scan(dx, dy, dz) {
+        const position = this.bot.entity.position;
+        const x0 = Math.floor(position.x);
+        const y0 = Math.floor(position.y);
+        const z0 = Math.floor(position.z);
+        const key = `${dx},${dy},${dz}`;
+        const cached = this.cache.get(key);
+        if (cached && cached.x === x0 && cached.y === y0 && cached.z === z0) {
+            return cached.blocks;
+        }
+        const blocks = new Set();
+        const minY = Math.max(y0 - dy, this.bot.game.minY);
+        const maxY = Math.min(
+            y0 + dy,
+            this.bot.game.minY + this.bot.game.height - 1
+        );
+        const local = this.local;
+        const columns = this.columns;
+        const minColumnZ = (z0 - dz) >> 4;
+        const maxColumnZ = (z0 + dz) >> 4;
+        // x, y, z order like bot.blockAt scans did, the set keeps the order blocks are first seen in
+        for (let x = x0 - dx; x <= x0 + dx; x++) {
+            local.x = x & 15;
+            for (let columnZ = minColumnZ; columnZ <= maxColumnZ; columnZ++) {
+                columns[columnZ - minColumnZ] = this.bot.world.getColumn(
+                    x >> 4,
+                    columnZ
+                );
+            }
+            for (let y = minY; y <= maxY; y++) {
+                local.y = y;
+                for (let z = z0 - dz; z <= z0 + dz; z++) {
+                    const column = columns[(z >> 4) - minColumnZ];
+                    if (!column) continue;
+                    local.z = z & 15;
+                    const name = this.blockName(column.getBlockStateId(local));
+                    if (name) blocks.add(name);
                 }
             }
         }
+        this.cache.set(key, { x: x0, y: y0, z: z0, dx, dy, dz, blocks });
+        return blocks;
     }
-    // console.log(surroundingBlocks);
-    return surroundingBlocks;
+}
+
+// The returned set is shared with later calls until the surroundings change, it must not be modified.
+function getSurroundingBlocks(bot, x_distance, y_distance, z_distance) {
+    if (!bot.voxelScanner) bot.voxelScanner = new VoxelScanner(bot);
+    return bot.voxelScanner.scan(x_distance, y_distance, z_distance);
 }
 
 function getInventoryItems(bot) {
@@ -0,0 +1,45 @@
+// Long-lived Babel parser worker for the python side.
+// Reads one JSON request per line on stdin: {"id": ..., "code": "..."}
+// and answers one JSON line per request on stdout:
+// {"id": ..., "functions": [{"name", "type", "body", "params"}]} or {"id": ..., "error": "..."}
+const readline = require("readline");
+const babel = require("@babel/core");
+const generate = require("@babel/generator").default;
+
+function parseFunctions(code) {
+    const parsed = babel.parse(code);
+    const functions = [];
+    for (const node of parsed.program.body) {
+        if (node.type !== "FunctionDeclaration") {
+            continue;
+        }
+        functions.push({
+            name: node.id.name,
+            type: node.async ? "AsyncFunctionDeclaration" : "FunctionDeclaration",
+            body: generate(node).code,
+            params: node.params.map((param) =>
+                param.type === "Identifier" ? param.name : null
+            ),
+        });
+    }
+    return { statements: parsed.program.body.length, functions };
+}
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+rl.on("line", (line) => {
+    if (!line.trim()) {
+        return;
+    }
+    let request = {};
+    let reply;
+    try {
+        request = JSON.parse(line);
+        reply = { id: request.id, ...parseFunctions(request.code) };
+    } catch (err) {
+        reply = { id: request.id, error: `${err.name}: ${err.message}` };
+    }
+    process.stdout.write(JSON.stringify(reply) + "\n");
+});
+rl.on("close", () => process.exit(0));
+
+process.stdout.write(JSON.stringify({ ready: true }) + "\n");
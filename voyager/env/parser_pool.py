@@ -0,0 +1,149 @@
+import atexit
+import itertools
+import json
+import os
+import queue
+import subprocess
+import threading
+
+import voyager.utils as U
+
+
+class BabelParserPool:
+    """
+    Pool of long-lived node workers running mineflayer/parser.js.
+    A parse is one JSON line each way instead of a javascript-bridge round-trip per AST node.
+    Raises ValueError when the code does not parse and RuntimeError when no worker can serve the request.
+    A worker that does not answer within timeout seconds is killed and replaced by the next parse.
+    """
+
+    def __init__(self, size=1, node="node", timeout=10, start_timeout=30):
+        self.size = size
+        self.node = node
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.script = U.f_join(
+            os.path.dirname(os.path.abspath(__file__)), "mineflayer", "parser.js"
+        )
+        # set to False once a worker failed to start, e.g. @babel/core is not installed
+        self.available = True
+        self._idle = queue.Queue()
+        self._num_workers = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+    def _spawn(self):
+        process = subprocess.Popen(
+            [self.node, self.script],
+            cwd=os.path.dirname(self.script),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            bufsize=1,
+        )
+        try:
+            line = self._readline(process, self.start_timeout)
+        except RuntimeError:
+            line = ""
+        try:
+            ready = json.loads(line).get("ready", False)
+        except ValueError:
+            ready = False
+        if not ready:
+            process.kill()
+            raise RuntimeError("Babel parser worker failed to start")
+        return process
+
+    @staticmethod
+    def _readline(process, timeout):
+        # a reader thread instead of select, which does not work on pipes on Windows
+        lines = []
+        reader = threading.Thread(
+            target=lambda: lines.append(process.stdout.readline()), daemon=True
+        )
+        reader.start()
+        reader.join(timeout)
+        if reader.is_alive():
+            # unblocks the reader
+            process.kill()
+            raise RuntimeError(f"Babel parser worker did not answer within {timeout}s")
+        return lines[0]
+
+    def _acquire(self):
+        with self._lock:
+            spawn = self._idle.empty() and self._num_workers < self.size
+            if spawn:
+                self._num_workers += 1
+        if not spawn:
+            return self._idle.get()
+        try:
+            return self._spawn()
+        except Exception:
+            with self._lock:
+                self._num_workers -= 1
+            self.available = False
+            raise RuntimeError("Babel parser worker failed to start")
+
+    def _release(self, process, healthy):
+        if healthy and process.poll() is None:
+            self._idle.put(process)
+            return
+        process.kill()
+        with self._lock:
+            self._num_workers -= 1
+
+    def parse(self, code):
+        """
+        :return: {"statements": number of top-level statements,
+        "functions": [{"name", "type", "body", "params"}] for every top-level function declaration}
+        """
+        if not self.available:
+            raise RuntimeError("Babel parser worker is not available")
+        process = self._acquire()
+        healthy = False
+        try:
+            request_id = next(self._ids)
+            process.stdin.write(json.dumps({"id": request_id, "code": code}) + "\n")
+            process.stdin.flush()
+            line = self._readline(process, self.timeout)
+            if not line:
+                raise RuntimeError("Babel parser worker exited")
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                # a corrupted reply is a worker fault, not a code error
+                raise RuntimeError(f"Babel parser worker sent an invalid reply: {line!r}")
+            healthy = reply.get("id") == request_id
+            if not healthy:
+                raise RuntimeError("Babel parser worker is out of sync")
+        finally:
+            self._release(process, healthy)
+        if "error" in reply:
+            raise ValueError(reply["error"])
+        return reply
+
+    def close(self):
+        while not self._idle.empty():
+            process = self._idle.get()
+            process.stdin.close()
+            process.kill()
+            with self._lock:
+                self._num_workers -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parser_pool(size=1):
+    """
+    Process-wide parser pool shared by every ActionAgent of the process.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BabelParserPool(size=size)
+            atexit.register(_pool.close)
+        _pool.size = max(_pool.size, size)
+        return _pool
@@ -0,0 +1,54 @@
+import functools
+import hashlib
+
+
+def program_hash(program):
+    return hashlib.sha1(program.encode("utf-8")).hexdigest()
+
+
+class ProgramRegistry:
+    """
+    Mirror of the program registry kept by the mineflayer server.
+    Programs are uploaded once by content hash, /step then only references the hashes.
+    """
+
+    def __init__(self):
+        self.uploaded = set()
+        # version of the last program bundle known to be fully uploaded
+        self.version = None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def hash(program):
+        # only plain program lists are hashed here, ProgramBundles carry their hashes
+        return program_hash(program)
+
+    def prepare(self, programs):
+        """
+        :param programs: list of program sources in execution order, a SkillManager ProgramBundle
+        also carries precomputed hashes and a version
+        :return: the hashes referencing them and a dict of the ones mineflayer does not hold yet
+        """
+        hashes = getattr(programs, "hashes", None)
+        version = getattr(programs, "version", None)
+        if hashes is None:
+            hashes = [self.hash(program) for program in programs]
+        hashes = list(hashes)
+        if version is not None and version == self.version:
+            return hashes, {}
+        missing = {}
+        for h, program in zip(hashes, programs):
+            if h not in self.uploaded:
+                missing[h] = program
+        if not missing:
+            self.version = version
+        return hashes, missing
+
+    def mark_uploaded(self, hashes, version=None):
+        self.uploaded.update(hashes)
+        self.version = version
+
+    def clear(self):
+        # the mineflayer process was restarted, nothing is uploaded anymore
+        self.uploaded.clear()
+        self.version = None
@@ -0,0 +1,128 @@
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    "start": None,  # falls back to request_timeout
+    "step": None,  # falls back to request_timeout
+    "programs": 60,
+    "cancel": 10,
+    "stop": 10,
+    "pause": 10,
+}
+
+
+class BridgeSession:
+    """
+    Keep-alive HTTP session to the mineflayer Express server.
+    A single pooled connection is reused across /start, /step, /pause and /stop
+    instead of opening a new TCP connection for every request.
+    The requests session is only opened by the first post, AsyncVoyagerEnv uses the timeouts and retry
+    settings alone and sends its requests with aiohttp.
+    """
+
+    def __init__(
+        self,
+        server,
+        request_timeout=600,
+        pool_maxsize=4,
+        max_retries=3,
+        retry_backoff=0.5,
+        endpoint_timeouts: Dict[str, float] = None,
+    ):
+        self.server = server
+        self.request_timeout = request_timeout
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.endpoint_timeouts = dict(DEFAULT_ENDPOINT_TIMEOUTS)
+        if endpoint_timeouts:
+            self.endpoint_timeouts.update(endpoint_timeouts)
+        self.num_requests = 0
+        self.session = None
+        self.adapter = None
+        self._retired_requests = 0
+        self._retired_connections = 0
+
+    def open(self):
+        # only connection errors are retried, a /step that reached the server must never be replayed
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=0,
+            backoff_factor=self.retry_backoff,
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+    def timeout(self, endpoint):
+        timeout = self.endpoint_timeouts.get(endpoint)
+        return self.request_timeout if timeout is None else timeout
+
+    def post(self, endpoint, json=None, timeout=None, stream=False):
+        """
+        :param stream: do not read the body yet, the timeout then bounds every read instead of the whole reply
+        """
+        if self.session is None:
+            self.open()
+        self.num_requests += 1
+        return self.session.post(
+            f"{self.server}/{endpoint}",
+            json=json,
+            timeout=self.timeout(endpoint) if timeout is None else timeout,
+            stream=stream,
+        )
+
+    def reset_pool(self):
+        """
+        Drop pooled connections, e.g. after the mineflayer process was restarted.
+        """
+        if self.session is None:
+            return
+        stats = self._pool_counters()
+        self._retired_requests += stats[0]
+        self._retired_connections += stats[1]
+        self.adapter.poolmanager.clear()
+
+    def close(self):
+        if self.session is None:
+            return
+        self.reset_pool()
+        self.session.close()
+        self.session = None
+        self.adapter = None
+
+    def _pool_counters(self):
+        num_requests = 0
+        num_connections = 0
+        if self.adapter is None:
+            return num_requests, num_connections
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            num_requests += pool.num_requests
+            num_connections += pool.num_connections
+        return num_requests, num_connections
+
+    @property
+    def stats(self):
+        num_requests, num_connections = self._pool_counters()
+        num_requests += self._retired_requests
+        num_connections += self._retired_connections
+        return {
+            "requests": self.num_requests,
+            "http_requests": num_requests,
+            "connections_opened": num_connections,
+            "connections_reused": max(num_requests - num_connections, 0),
+        }
@@ -0,0 +1,142 @@
+import json
+import re
+
+from .wire import Events
+
+
+def complete_events(streamed, observation):
+    """
+    Events for a step that was aborted before mineflayer sent its observation: the streamed events,
+    completed with the fields of the observation taken afterwards, followed by that observation.
+    """
+    fields = {k: v for k, v in observation[-1][1].items() if not k.startswith("on")}
+    return [
+        [event_type, {**fields, **event}] for event_type, event in streamed
+    ] + observation
+
+
+class RepeatedMessageAbort:
+    """
+    Early-abort policy: abort the step once chat or error messages matching a pattern were seen max_repeats
+    times, e.g. a program stuck retrying a recipe it cannot make.
+    """
+
+    def __init__(
+        self,
+        patterns=(r"^I cannot make", r"^I cannot do the recipe", r"^No .* nearby"),
+        max_repeats=3,
+    ):
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.max_repeats = max_repeats
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
+
+    def __call__(self, event_type, event):
+        message = event.get(event_type)
+        if event_type not in ("onChat", "onError") or not isinstance(message, str):
+            return False
+        if any(pattern.search(message) for pattern in self.patterns):
+            self.count += 1
+        return self.count >= self.max_repeats
+
+
+class StepStream:
+    """
+    Events of a running step, streamed by mineflayer as NDJSON.
+    Iterating yields [event_type, event] for the onChat / onError / onSave events as they happen, the event
+    only holds its own field. Once the iteration ends, events holds the complete events of the step.
+    abort() cancels the step early, events then holds its complete events as well.
+    """
+
+    def __init__(self, env, response):
+        self.env = env
+        self.response = response
+        # a single line iterator, so that abort can carry on reading where the caller stopped
+        self._lines = self._read_lines()
+        self.streamed = []
+        self.events: Events = None
+        self.aborted = False
+
+    def _read_lines(self):
+        return self.response.iter_lines()
+
+    def _handle_line(self, line):
+        message = json.loads(line)
+        if message["type"] == "event":
+            event = [message["name"], message["data"]]
+            self.streamed.append(event)
+            return event
+        observation = message["observation"]
+        if message["delta"]:
+            observation = self.env.delta_decoder.decode(observation)
+        self.events = observation
+        return None
+
+    def __iter__(self):
+        for line in self._lines:
+            if not line:
+                continue
+            event = self._handle_line(line)
+            if event is not None:
+                yield event
+        self.response.close()
+        if self.events is None and not self.aborted:
+            raise RuntimeError("Mineflayer closed the step stream without an observation")
+
+    def abort(self, reason="aborted by the early-abort policy"):
+        """
+        Cancel the step through /cancel and read the rest of the stream. If that fails, close the connection,
+        which cancels the step as well, and observe again.
+        """
+        if self.events is not None:
+            return self.events
+        self.aborted = True
+        try:
+            if self.env.cancel(reason):
+                for _ in self:
+                    pass
+        except Exception as e:
+            print(f"\033[31mCould not cancel the step: {e}\033[0m")
+        if self.events is None:
+            self.response.close()
+            self.events = complete_events(self.streamed, self.env.step(""))
+        return self.events
+
+
+class AsyncStepStream(StepStream):
+    """
+    asyncio counterpart of StepStream, iterate it with async for and await abort().
+    """
+
+    async def _read_lines(self):
+        async for line in self.response.content:
+            yield line
+
+    async def __aiter__(self):
+        async for line in self._lines:
+            line = line.strip()
+            if not line:
+                continue
+            event = self._handle_line(line)
+            if event is not None:
+                yield event
+        self.response.release()
+        if self.events is None and not self.aborted:
+            raise RuntimeError("Mineflayer closed the step stream without an observation")
+
+    async def abort(self, reason="aborted by the early-abort policy"):
+        if self.events is not None:
+            return self.events
+        self.aborted = True
+        try:
+            if await self.env.cancel(reason):
+                async for _ in self:
+                    pass
+        except Exception as e:
+            print(f"\033[31mCould not cancel the step: {e}\033[0m")
+        if self.events is None:
+            self.response.close()
+            self.events = complete_events(self.streamed, await self.env.step(""))
+        return self.events
@@ -0,0 +1,160 @@
+import json
+from typing import Dict, List, Optional, Tuple, TypedDict, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# version 1: the observation is a JSON string inside the JSON response, sent by servers predating the header
+# version 2: the observation itself, JSON or msgpack encoded, optionally delta encoded
+WIRE_VERSION = 2
+WIRE_HEADER = "X-Voyager-Wire"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+class Position(TypedDict):
+    x: float
+    y: float
+    z: float
+
+
+class Status(TypedDict):
+    health: float
+    food: float
+    saturation: float
+    oxygen: float
+    position: Position
+    velocity: Position
+    yaw: float
+    pitch: float
+    onGround: bool
+    equipment: List[Optional[str]]
+    name: str
+    timeSinceOnGround: float
+    isInWater: bool
+    isInLava: bool
+    isInWeb: bool
+    isCollidedHorizontally: bool
+    isCollidedVertically: bool
+    biome: str
+    entities: Dict[str, float]
+    timeOfDay: str
+    inventoryUsed: int
+    elapsedTime: int
+
+
+class EventData(TypedDict, total=False):
+    onChat: str
+    onError: str
+    onSave: str
+    voxels: List[str]
+    status: Status
+    inventory: Dict[str, int]
+    # position -> items, "Unknown" or "Invalid"
+    nearbyChests: Dict[str, Union[Dict[str, int], str]]
+    blockRecords: List[str]
+
+
+# [event name, event data], decoded as two item lists
+Event = Tuple[str, EventData]
+Events = List[Event]
+
+
+def supported_encodings():
+    return ["msgpack", "json"] if msgpack is not None else ["json"]
+
+
+def wire_request(encoding=None, delta=False):
+    """
+    The wire format offer sent with /start, the server answers observations with the first encoding it supports.
+    :param encoding: "json" or "msgpack", None for the most compact one available
+    :param delta: ask for delta encoded observations, see DeltaDecoder
+    """
+    encodings = supported_encodings()
+    if encoding is not None:
+        if encoding not in encodings:
+            raise ValueError(
+                f"Wire encoding {encoding} is not available, supported: {encodings}"
+            )
+        encodings = [encoding]
+    return {"version": WIRE_VERSION, "encodings": encodings, "delta": delta}
+
+
+def parse_wire_header(header):
+    """
+    :return: (version, flags), e.g. "2; encoding=json; delta" -> (2, {"encoding": "json", "delta": True})
+    """
+    if not header:
+        return 1, {}
+    version, *params = [part.strip() for part in header.split(";")]
+    flags = {}
+    for param in params:
+        key, _, value = param.partition("=")
+        flags[key] = value or True
+    return int(version), flags
+
+
+class DeltaDecoder:
+    """
+    Rebuilds complete events from delta encoded observations.
+    The server answers with {"seq": n, "base": m, "events": [...]}, where every event only has the fields that
+    changed since the previous event, the first one relative to the last event of response m, the client
+    acknowledges the last response it decoded with the next /step. base is None when the server starts over,
+    e.g. after /start or when the acknowledged response is not the one it last sent.
+    "on*" fields belong to a single event and are always sent, every event has all the other observation fields.
+
+    Unchanged fields of the rebuilt events are shared with the previous ones, the events must be treated as
+    read only below the top level dicts.
+    """
+
+    def __init__(self):
+        self.seq = None
+        self.baseline = {}
+
+    def reset(self):
+        self.seq = None
+        self.baseline = {}
+
+    def decode(self, envelope) -> Events:
+        if envelope["base"] is None:
+            baseline = {}
+        elif envelope["base"] == self.seq:
+            baseline = self.baseline
+        else:
+            raise RuntimeError(
+                f"Observation delta is based on {envelope['base']}, last decoded {self.seq}"
+            )
+        events = []
+        for event_type, delta in envelope["events"]:
+            event = dict(baseline)
+            event.update(delta)
+            events.append([event_type, event])
+            baseline = {k: v for k, v in event.items() if not k.startswith("on")}
+        self.baseline = baseline
+        self.seq = envelope["seq"]
+        return events
+
+
+def decode_events(content_type, header, body, decoder=None) -> Events:
+    """
+    Decode an observation response in a single pass.
+    :param content_type: the response Content-Type
+    :param header: the X-Voyager-Wire response header, None if the server did not send it
+    :param body: the raw response body
+    :param decoder: DeltaDecoder of the connection, required if delta observations were requested
+    """
+    version, flags = parse_wire_header(header)
+    if content_type and content_type.startswith(MSGPACK_CONTENT_TYPE):
+        if msgpack is None:
+            raise RuntimeError("Received a msgpack observation but msgpack is not installed")
+        events = msgpack.unpackb(body, raw=False)
+    else:
+        events = json.loads(body)
+        if version < 2:
+            events = json.loads(events)
+    if flags.get("delta"):
+        if decoder is None:
+            raise RuntimeError("Received a delta observation without a DeltaDecoder")
+        events = decoder.decode(events)
+    return events
@@ -0,0 +1,2 @@
+from .cache import LLMResponseCache, CachedChatModel, cache_chat_model, get_llm_cache
+from .retry import RetryExecutor, CircuitBreaker, CircuitOpenError, LLMParseError
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain.schema import AIMessage, ChatGeneration, LLMResult
+
+
+def messages_key(model_name, temperature, messages):
+    """
+    Content address of a chat completion request.
+    """
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "temperature": temperature,
+            "messages": [[message.type, message.content] for message in messages],
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of chat completions keyed by (model, temperature, messages hash).
+    Entries expire after ttl seconds and the least recently used ones are evicted above max_entries.
+    The sqlite file can be shared by every bot process using the same ckpt dir.
+    """
+
+    def __init__(self, path, ttl=None, max_entries=100000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # hit / miss counters per agent
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, content TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        self._db.commit()
+
+    def get(self, key, name="default"):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses[name] = self.misses.get(name, 0) + 1
+                return None
+            self._db.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return row[0]
+
+    def put(self, key, model_name, content):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, content, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self._db.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+            )
+        if self.max_entries is not None:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    @property
+    def stats(self):
+        stats = {}
+        for name in set(self.hits) | set(self.misses):
+            hits = self.hits.get(name, 0)
+            misses = self.misses.get(name, 0)
+            stats[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+        return stats
+
+
+class CachedChatModel:
+    """
+    Wraps a langchain chat model so that a request already answered is served from an LLMResponseCache.
+    Only meant for models with temperature 0, see cache_chat_model.
+    Supports the calls the agents make: llm(messages) and await llm.agenerate([messages]).
+    Everything else is forwarded to the wrapped model.
+    """
+
+    def __init__(self, llm, cache, name="default"):
+        self.llm = llm
+        self.cache = cache
+        self.name = name
+
+    def __getattr__(self, item):
+        return getattr(self.llm, item)
+
+    def _key(self, messages):
+        return messages_key(
+            self.llm.model_name, getattr(self.llm, "temperature", None), messages
+        )
+
+    def __call__(self, messages, *args, **kwargs):
+        key = self._key(messages)
+        content = self.cache.get(key, self.name)
+        if content is not None:
+            return AIMessage(content=content)
+        message = self.llm(messages, *args, **kwargs)
+        self.cache.put(key, self.llm.model_name, message.content)
+        return message
+
+    def discard(self, messages):
+        """
+        Forget the completion of a request, e.g. when the caller could not parse it and asks again.
+        """
+        self.cache.delete(self._key(messages))
+
+    async def agenerate(self, messages, *args, **kwargs):
+        keys = [self._key(m) for m in messages]
+        contents = [self.cache.get(key, self.name) for key in keys]
+        missing = [i for i, content in enumerate(contents) if content is None]
+        if missing:
+            result = await self.llm.agenerate(
+                [messages[i] for i in missing], *args, **kwargs
+            )
+            for i, generations in zip(missing, result.generations):
+                contents[i] = generations[0].message.content
+                self.cache.put(keys[i], self.llm.model_name, contents[i])
+        return LLMResult(
+            generations=[
+                [ChatGeneration(message=AIMessage(content=content))]
+                for content in contents
+            ]
+        )
+
+
+def cache_chat_model(llm, cache, name="default"):
+    """
+    Wrap llm in a CachedChatModel if it samples deterministically. A cached completion of a model with a
+    non-zero temperature would freeze one sample and replay it for every identical request, such models are
+    returned unwrapped.
+    """
+    if cache is None:
+        return llm
+    temperature = getattr(llm, "temperature", None)
+    if temperature != 0:
+        print(
+            f"\033[33mNot caching {name} LLM completions, its temperature is {temperature} instead of 0\033[0m"
+        )
+        return llm
+    return CachedChatModel(llm, cache, name=name)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache(path, ttl=None, max_entries=100000):
+    """
+    Process-wide LLMResponseCache per file, shared by every agent of the process.
+    """
+    path = os.path.abspath(path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LLMResponseCache(path, ttl=ttl, max_entries=max_entries)
+        return _caches[path]
@@ -0,0 +1,193 @@
+import asyncio
+import random
+import threading
+import time
+
+import openai
+from langchain.schema import AIMessage, HumanMessage
+
+# failures of the request itself, worth retrying after a while
+TRANSPORT_ERRORS = (
+    openai.error.Timeout,
+    openai.error.APIError,
+    openai.error.APIConnectionError,
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class LLMParseError(ValueError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling a model for reset_timeout seconds after failure_threshold consecutive transport errors,
+    then lets a single request probe it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            wait = self.opened_at + self.reset_timeout - time.time()
+            if wait > 0:
+                raise CircuitOpenError(
+                    f"Circuit for {self.name} is open, retry in {wait:.1f}s"
+                )
+            # half open: the next failure opens it again right away
+            self.failures = self.failure_threshold - 1
+            self.opened_at = None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model_name):
+    """
+    Process-wide breaker per model, shared by every agent calling it.
+    """
+    with _breakers_lock:
+        if model_name not in _breakers:
+            _breakers[model_name] = CircuitBreaker(model_name)
+        return _breakers[model_name]
+
+
+class RetryExecutor:
+    """
+    Runs LLM calls for one agent.
+    Transport errors are retried with exponential backoff and jitter, parse errors are repaired by sending
+    the unparsable reply back with the error instead of repeating the identical request.
+    """
+
+    def __init__(self, name, max_retries=5, base_delay=1.0, max_delay=30.0):
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = {
+            "calls": 0,
+            "retries": 0,
+            "transport_errors": 0,
+            "parse_errors": 0,
+            "failures": 0,
+        }
+
+    def backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        # full jitter so that bots hitting the same rate limit do not retry in lockstep
+        return random.uniform(0, delay)
+
+    @staticmethod
+    def repair_messages(messages, reply, error):
+        return list(messages) + [
+            AIMessage(content=reply),
+            HumanMessage(
+                content=f"Your response could not be parsed: {error}\n"
+                f"Respond again, strictly in the required format."
+            ),
+        ]
+
+    def _discard(self, llm, messages):
+        # a cached reply that does not parse must not be served again
+        discard = getattr(llm, "discard", None)
+        if callable(discard):
+            discard(messages)
+
+    def _on_transport_error(self, breaker, attempt, retries, error):
+        breaker.record_failure()
+        self.metrics["transport_errors"] += 1
+        if attempt >= retries - 1:
+            self.metrics["failures"] += 1
+            raise error
+        self.metrics["retries"] += 1
+        delay = self.backoff(attempt)
+        print(
+            f"\033[33m{self.name} LLM call failed ({type(error).__name__}), retrying in {delay:.1f}s\033[0m"
+        )
+        return delay
+
+    def _on_parse_error(self, llm, request, attempt, retries, error):
+        self._discard(llm, request)
+        self.metrics["parse_errors"] += 1
+        print(f"\033[33m{self.name} could not parse LLM response: {error}\033[0m")
+        if attempt >= retries - 1:
+            self.metrics["failures"] += 1
+            raise LLMParseError(str(error)) from error
+        self.metrics["retries"] += 1
+
+    def run(self, llm, messages, parse=None, max_retries=None):
+        """
+        :param parse: called with the reply content, an exception means the reply has to be repaired
+        :param max_retries: number of attempts, None for the executor default, 0 still makes a single attempt
+        :return: the parsed reply, or the AIMessage if parse is None
+        """
+        retries = max(self.max_retries if max_retries is None else max_retries, 1)
+        breaker = get_circuit_breaker(getattr(llm, "model_name", self.name))
+        request = messages
+        self.metrics["calls"] += 1
+        for attempt in range(retries):
+            breaker.before_call()
+            try:
+                message = llm(request)
+            except TRANSPORT_ERRORS as e:
+                time.sleep(self._on_transport_error(breaker, attempt, retries, e))
+                continue
+            breaker.record_success()
+            if parse is None:
+                return message
+            try:
+                return parse(message.content)
+            except Exception as e:
+                self._on_parse_error(llm, request, attempt, retries, e)
+                request = self.repair_messages(messages, message.content, e)
+
+    async def arun(self, llm, messages, parse=None):
+        """
+        asyncio counterpart of run, calls llm.agenerate.
+        """
+        breaker = get_circuit_breaker(getattr(llm, "model_name", self.name))
+        request = messages
+        self.metrics["calls"] += 1
+        for attempt in range(self.max_retries):
+            breaker.before_call()
+            try:
+                result = await llm.agenerate([request])
+            except TRANSPORT_ERRORS as e:
+                await asyncio.sleep(
+                    self._on_transport_error(breaker, attempt, self.max_retries, e)
+                )
+                continue
+            breaker.record_success()
+            message = result.generations[0][0].message
+            if parse is None:
+                return message
+            try:
+                return parse(message.content)
+            except Exception as e:
+                self._on_parse_error(llm, request, attempt, self.max_retries, e)
+                request = self.repair_messages(messages, message.content, e)
@@ -1,7 +1,5 @@
-import pkg_resources
-import voyager.utils as U
+from voyager.resources import read_text
 
 
 def load_prompt(prompt):
-    package_path = pkg_resources.resource_filename("voyager", "")
-    return U.load_text(f"{package_path}/prompts/{prompt}.txt")
+    return read_text("prompts", f"{prompt}.txt")
@@ -0,0 +1,79 @@
+import argparse
+import functools
+import os
+from importlib import resources
+
+import voyager.utils as U
+
+
+RESOURCE_DIRS = ["prompts", "control_primitives", "control_primitives_context"]
+RESOURCE_SUFFIXES = (".txt", ".js")
+BUNDLE_ENV = "VOYAGER_RESOURCE_BUNDLE"
+
+
+@functools.lru_cache(maxsize=None)
+def _bundle():
+    """
+    Optional precompiled bundle (see build_bundle), a json file mapping "dir/name" to the file content.
+    """
+    path = os.environ.get(BUNDLE_ENV)
+    if not path:
+        return None
+    return U.load_json(path)
+
+
+@functools.lru_cache(maxsize=None)
+def read_text(resource_dir, name):
+    """
+    Content of a resource file shipped with the voyager package, read once per process.
+    """
+    bundle = _bundle()
+    key = f"{resource_dir}/{name}"
+    if bundle is not None and key in bundle:
+        return bundle[key]
+    return resources.files("voyager").joinpath(resource_dir, name).read_text(
+        encoding="utf-8"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def list_names(resource_dir, suffix):
+    """
+    Sorted names (without suffix) of the resource files in resource_dir.
+    """
+    bundle = _bundle()
+    if bundle is not None:
+        names = [
+            key[len(resource_dir) + 1 : -len(suffix)]
+            for key in bundle
+            if key.startswith(f"{resource_dir}/") and key.endswith(suffix)
+        ]
+    else:
+        names = [
+            entry.name[: -len(suffix)]
+            for entry in resources.files("voyager").joinpath(resource_dir).iterdir()
+            if entry.name.endswith(suffix)
+        ]
+    return tuple(sorted(names))
+
+
+def build_bundle(path):
+    bundle = {}
+    for resource_dir in RESOURCE_DIRS:
+        for suffix in RESOURCE_SUFFIXES:
+            for name in list_names(resource_dir, suffix):
+                bundle[f"{resource_dir}/{name}{suffix}"] = read_text(
+                    resource_dir, f"{name}{suffix}"
+                )
+    U.dump_json(bundle, path)
+    return bundle
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=f"Precompile prompts and primitives into one json file, load it with {BUNDLE_ENV}=<path>"
+    )
+    parser.add_argument("path")
+    args = parser.parse_args()
+    bundle = build_bundle(args.path)
+    print(f"Wrote {len(bundle)} resources to {args.path}")
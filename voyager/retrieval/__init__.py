@@ -0,0 +1,4 @@
+from .embeddings import HashingEmbeddings, get_embedding_function
+from .cache import EmbeddingCache, CachedEmbeddings, get_embedding_cache
+from .numpy_store import NumpyVectorStore
+from .service import SkillRetrievalServer, SkillRetrievalClient
@@ -0,0 +1,167 @@
+import array
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List
+
+from langchain.embeddings.base import Embeddings
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def embedding_model_name(embeddings):
+    for attr in ("model", "model_name"):
+        name = getattr(embeddings, attr, None)
+        if isinstance(name, str):
+            return name
+    return type(embeddings).__name__
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model, text hash).
+    Vectors are stored in a sqlite file so that every process sharing a ckpt dir reuses them,
+    with an in-memory LRU in front of it.
+    """
+
+    def __init__(self, path, max_memory_items=10000):
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._db.commit()
+
+    def _remember(self, key, vector):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    def get_many(self, model, hashes):
+        """
+        :return: a list aligned with hashes, None where the vector is not cached
+        """
+        result = [None] * len(hashes)
+        lookup = {}
+        with self._lock:
+            for i, h in enumerate(hashes):
+                key = (model, h)
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    result[i] = self.memory[key]
+                    self.memory_hits += 1
+                else:
+                    lookup.setdefault(h, []).append(i)
+            if lookup:
+                unique = list(lookup)
+                # stay below the sqlite variable limit
+                for start in range(0, len(unique), 500):
+                    chunk = unique[start : start + 500]
+                    rows = self._db.execute(
+                        f"SELECT hash, vector FROM embeddings WHERE model = ? "
+                        f"AND hash IN ({','.join('?' * len(chunk))})",
+                        [model] + chunk,
+                    ).fetchall()
+                    for h, blob in rows:
+                        vector = array.array("f", blob).tolist()
+                        self._remember((model, h), vector)
+                        for i in lookup[h]:
+                            result[i] = vector
+            for i, vector in enumerate(result):
+                if vector is None:
+                    self.misses += 1
+                elif hashes[i] in lookup:
+                    self.hits += 1
+        return result
+
+    def put_many(self, model, hashes, vectors):
+        with self._lock:
+            rows = []
+            for h, vector in zip(hashes, vectors):
+                vector = list(vector)
+                self._remember((model, h), vector)
+                rows.append((model, h, array.array("f", vector).tobytes()))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+
+    @property
+    def stats(self):
+        lookups = self.memory_hits + self.hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.hits) / lookups if lookups else 0.0,
+            "memory_items": len(self.memory),
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings provider so that texts already embedded by this model are never sent to it again.
+    """
+
+    def __init__(self, embeddings, cache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = embedding_model_name(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model, hashes)
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(hashes[i], texts[i])
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            self.cache.put_many(self.model, list(missing.keys()), new_vectors)
+            computed = dict(zip(missing.keys(), new_vectors))
+            vectors = [
+                computed[h] if vector is None else vector
+                for h, vector in zip(hashes, vectors)
+            ]
+        return [list(vector) for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        h = text_hash(text)
+        vector = self.cache.get_many(self.model, [h])[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many(self.model, [h], [vector])
+        return list(vector)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path, max_memory_items=10000):
+    """
+    Process-wide EmbeddingCache per file, so every vector store of the process shares one LRU.
+    """
+    path = os.path.abspath(path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(path, max_memory_items=max_memory_items)
+        return _caches[path]
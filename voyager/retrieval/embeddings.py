@@ -0,0 +1,96 @@
+import math
+import re
+import zlib
+from typing import List
+
+from langchain.embeddings.base import Embeddings
+from langchain.embeddings.openai import OpenAIEmbeddings
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Local, offline embeddings based on signed feature hashing.
+    Word unigrams, word bigrams and character trigrams are hashed into a fixed size vector
+    with sublinear term frequency weighting, then L2 normalized.
+    No model download and no network, so retrieval costs well under a millisecond per text.
+    """
+
+    def __init__(self, dim=1024, char_ngram_weight=0.5):
+        self.dim = dim
+        self.char_ngram_weight = char_ngram_weight
+        self.model = f"hashing-{dim}"
+
+    @staticmethod
+    def tokenize(text):
+        # split camelCase identifiers so that mineWoodLog matches "mine wood log"
+        text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+        return re.findall(r"[a-z]+|\d+", text.lower())
+
+    def _features(self, text):
+        words = self.tokenize(text)
+        features = {}
+
+        def add(feature, weight):
+            features[feature] = features.get(feature, 0.0) + weight
+
+        for word in words:
+            add(f"w:{word}", 1.0)
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                add(f"c:{padded[i:i + 3]}", self.char_ngram_weight)
+        for first, second in zip(words, words[1:]):
+            add(f"b:{first}_{second}", 1.0)
+        return features
+
+    def _embed(self, text):
+        vector = [0.0] * self.dim
+        for feature, count in self._features(text).items():
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign * math.log1p(count)
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm > 0:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def get_embedding_function(embedding_model="openai", cache_path=None, **kwargs):
+    """
+    :param embedding_model: an Embeddings instance, or one of
+    "openai": remote OpenAI embeddings (default, what the released skill libraries were built with),
+    "hashing": HashingEmbeddings, local and offline,
+    "sentence_transformers" or "sentence_transformers:<model name>": a local sentence-transformers model,
+    requires the sentence-transformers package.
+    Vector dbs persisted with one embedding model cannot be queried with another one.
+    :param cache_path: if set, embeddings are cached on disk in this sqlite file, shared by the whole process
+    """
+    embeddings = _get_embedding_function(embedding_model, **kwargs)
+    if cache_path:
+        from .cache import CachedEmbeddings, get_embedding_cache
+
+        embeddings = CachedEmbeddings(embeddings, get_embedding_cache(cache_path))
+    return embeddings
+
+
+def _get_embedding_function(embedding_model, **kwargs):
+    if isinstance(embedding_model, Embeddings):
+        return embedding_model
+    if embedding_model == "openai":
+        return OpenAIEmbeddings(**kwargs)
+    if embedding_model == "hashing":
+        return HashingEmbeddings(**kwargs)
+    if embedding_model.startswith("sentence_transformers"):
+        from langchain.embeddings import HuggingFaceEmbeddings
+
+        _, _, model_name = embedding_model.partition(":")
+        return HuggingFaceEmbeddings(
+            model_name=model_name or "sentence-transformers/all-MiniLM-L6-v2",
+            **kwargs,
+        )
+    raise ValueError(f"Unknown embedding model: {embedding_model}")
@@ -0,0 +1,64 @@
+"""
+Convert the Chroma skill vectordb of a checkpoint to the NumpyVectorStore format.
+The stored embeddings are copied as they are, nothing is re-embedded.
+
+Usage: python -m voyager.retrieval.migrate ckpt_dir [ckpt_dir ...]
+"""
+import argparse
+import os
+
+from langchain.vectorstores import Chroma
+
+import voyager.utils as U
+from .numpy_store import NumpyVectorStore
+
+
+def load_chroma_embeddings(persist_directory, collection_name):
+    """
+    Read the ids and embeddings of a collection persisted by Chroma (duckdb+parquet) without opening a
+    Chroma client, which would write its in-memory state back to persist_directory at exit.
+    :return: (ids, embeddings), empty if nothing was persisted yet
+    """
+    import duckdb
+
+    embeddings_path = f"{persist_directory}/chroma-embeddings.parquet"
+    collections_path = f"{persist_directory}/chroma-collections.parquet"
+    if not os.path.exists(embeddings_path) or not os.path.exists(collections_path):
+        return [], []
+    rows = duckdb.execute(
+        f"SELECT e.id, e.embedding FROM read_parquet('{embeddings_path}') e "
+        f"JOIN read_parquet('{collections_path}') c ON e.collection_uuid = c.uuid "
+        f"WHERE c.name = ?",
+        [collection_name],
+    ).fetchall()
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+def migrate_skill_vectordb(ckpt_dir, collection_name="skill_vectordb"):
+    chroma = Chroma(
+        collection_name=collection_name,
+        persist_directory=f"{ckpt_dir}/skill/vectordb",
+    )
+    data = chroma._collection.get(include=["embeddings"])
+    skills = U.load_json(f"{ckpt_dir}/skill/skills.json")
+    assert set(data["ids"]) == set(skills), (
+        f"Chroma vectordb in {ckpt_dir}/skill/vectordb is not synced with skills.json, "
+        f"{len(data['ids'])} vs {len(skills)} skills"
+    )
+    store = NumpyVectorStore(f"{ckpt_dir}/skill/vectordb.npy", embedding_function=None)
+    store.delete(store.ids)
+    if data["ids"]:
+        store.add_embeddings(data["embeddings"], data["ids"])
+    store.persist()
+    print(
+        f"\033[33mMigrated {store.count()} skills to {store.persist_path}\033[0m"
+    )
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("ckpt_dirs", nargs="+")
+    args = parser.parse_args()
+    for ckpt_dir in args.ckpt_dirs:
+        migrate_skill_vectordb(ckpt_dir)
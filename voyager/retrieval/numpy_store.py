@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+
+
+class NumpyVectorStore:
+    """
+    In-process vector store for small collections such as the skill library.
+    Ids and embeddings live in a single structured .npy file that is memory-mapped on load,
+    retrieval is a vectorized cosine top-k. Changes are kept in memory until persist(),
+    which atomically replaces the file. With persist_path None the store only lives in memory.
+    """
+
+    def __init__(self, persist_path, embedding_function):
+        self.persist_path = persist_path
+        self.embedding_function = embedding_function
+        self.ids = []
+        self.vectors = None
+        self._normalized = None
+        if persist_path is not None and os.path.exists(persist_path):
+            self.load()
+
+    def load(self):
+        data = np.load(self.persist_path, mmap_mode="r")
+        self.ids = [str(i) for i in data["id"]]
+        self.vectors = data["vector"]
+        self._normalized = None
+
+    def count(self):
+        return len(self.ids)
+
+    def add_texts(self, texts, ids, metadatas=None):
+        embeddings = self.embedding_function.embed_documents(list(texts))
+        self.add_embeddings(embeddings, ids)
+        return list(ids)
+
+    def add_embeddings(self, embeddings, ids):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings[None, :]
+        assert len(embeddings) == len(ids)
+        if self.vectors is None or len(self.ids) == 0:
+            vectors = embeddings
+            all_ids = list(ids)
+        else:
+            assert (
+                embeddings.shape[1] == self.vectors.shape[1]
+            ), f"Embedding dimension {embeddings.shape[1]} does not match the store ({self.vectors.shape[1]})"
+            vectors = np.array(self.vectors, dtype=np.float32)
+            all_ids = list(self.ids)
+            index = {id_: i for i, id_ in enumerate(all_ids)}
+            new_rows = []
+            for id_, embedding in zip(ids, embeddings):
+                if id_ in index:
+                    vectors[index[id_]] = embedding
+                else:
+                    index[id_] = len(all_ids)
+                    all_ids.append(id_)
+                    new_rows.append(embedding)
+            if new_rows:
+                vectors = np.concatenate([vectors, np.stack(new_rows)])
+        self.ids = all_ids
+        self.vectors = vectors
+        self._normalized = None
+
+    def delete(self, ids):
+        ids = set(ids)
+        keep = [i for i, id_ in enumerate(self.ids) if id_ not in ids]
+        if len(keep) == len(self.ids):
+            return
+        self.ids = [self.ids[i] for i in keep]
+        self.vectors = np.array(self.vectors[keep], dtype=np.float32)
+        self._normalized = None
+
+    def persist(self):
+        assert self.persist_path is not None, "in-memory store cannot be persisted"
+        if self.vectors is None:
+            return
+        max_len = max([len(id_) for id_ in self.ids] + [1])
+        data = np.empty(
+            len(self.ids),
+            dtype=[("id", f"U{max_len}"), ("vector", np.float32, (self.vectors.shape[1],))],
+        )
+        data["id"] = self.ids
+        data["vector"] = self.vectors
+        # materialize before replacing the memory-mapped file
+        self.vectors = np.array(self.vectors, dtype=np.float32)
+        tmp_path = f"{self.persist_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.persist_path)
+
+    @property
+    def normalized(self):
+        if self._normalized is None:
+            vectors = np.asarray(self.vectors, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self._normalized = vectors / np.maximum(norms, 1e-12)
+        return self._normalized
+
+    def search_by_vectors(self, query_vectors, k):
+        """
+        :return: for every query, a list of (id, cosine distance) sorted from nearest to farthest
+        """
+        if not self.ids or k <= 0:
+            return [[] for _ in query_vectors]
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        queries = queries / np.maximum(
+            np.linalg.norm(queries, axis=1, keepdims=True), 1e-12
+        )
+        scores = queries @ self.normalized.T
+        k = min(k, len(self.ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-row[candidates])]
+            results.append([(self.ids[i], float(1.0 - row[i])) for i in ranked])
+        return results
+
+    def search(self, query, k):
+        return self.search_by_vectors(
+            [self.embedding_function.embed_query(query)], k
+        )[0]
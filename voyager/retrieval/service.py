@@ -0,0 +1,161 @@
+import argparse
+import os
+import threading
+from multiprocessing.connection import Client, Listener
+
+
+DEFAULT_AUTHKEY = b"voyager-skill-retrieval"
+
+
+def parse_address(address):
+    """
+    "host:port" is served over TCP, anything else is a unix socket path.
+    """
+    if isinstance(address, (tuple, list)):
+        return tuple(address)
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "localhost", int(port)
+    return address
+
+
+def get_authkey():
+    authkey = os.environ.get("VOYAGER_RETRIEVAL_AUTHKEY")
+    return authkey.encode("utf-8") if authkey else DEFAULT_AUTHKEY
+
+
+class SkillRetrievalServer:
+    """
+    Serves skill retrieval to every agent process of a host, so the skill library and its
+    vector index are loaded once per machine instead of once per bot.
+    The library is reloaded read-only whenever skills.json changes on disk, a reload that fails, e.g. while
+    an agent is still writing the library, keeps serving the previous one and is retried with the next request.
+    """
+
+    def __init__(self, address, authkey=None, **skill_manager_kwargs):
+        self.address = parse_address(address)
+        self.authkey = authkey or get_authkey()
+        skill_manager_kwargs["resume"] = True
+        skill_manager_kwargs["read_only"] = True
+        skill_manager_kwargs.pop("retrieval_address", None)
+        self.skill_manager_kwargs = skill_manager_kwargs
+        self.skills_path = (
+            f"{skill_manager_kwargs.get('ckpt_dir', 'ckpt')}/skill/skills.json"
+        )
+        self.skill_manager = None
+        self.skills_mtime = None
+        self._lock = threading.Lock()
+
+    def _reload_if_changed(self):
+        from voyager.agents.skill import SkillManager
+
+        mtime = os.path.getmtime(self.skills_path)
+        if self.skill_manager is not None and mtime == self.skills_mtime:
+            return
+        print(f"\033[33mSkill retrieval server loading {self.skills_path}\033[0m")
+        try:
+            skill_manager = SkillManager(**self.skill_manager_kwargs)
+        except Exception as e:
+            if self.skill_manager is None:
+                raise
+            print(
+                f"\033[31mSkill retrieval server could not reload {self.skills_path}, "
+                f"serving the previous library: {e}\033[0m"
+            )
+            return
+        self.skill_manager = skill_manager
+        self.skills_mtime = mtime
+
+    def handle(self, method, args):
+        with self._lock:
+            self._reload_if_changed()
+            if method == "retrieve_skills":
+                return self.skill_manager.retrieve_skills(*args)
+            if method == "retrieve_skills_batch":
+                return self.skill_manager.retrieve_skills_batch(*args)
+            if method == "ping":
+                return len(self.skill_manager.skills)
+        raise ValueError(f"Unknown method {method}")
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except (EOFError, ConnectionResetError):
+                    return
+                try:
+                    conn.send(("ok", self.handle(method, args)))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    def serve_forever(self):
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"\033[33mSkill retrieval server listening on {self.address}\033[0m")
+            while True:
+                conn = listener.accept()
+                threading.Thread(
+                    target=self._serve_connection, args=(conn,), daemon=True
+                ).start()
+
+
+class SkillRetrievalClient:
+    """
+    Same retrieval API as SkillManager, answered by a SkillRetrievalServer.
+    """
+
+    def __init__(self, address, authkey=None):
+        self.address = parse_address(address)
+        self.authkey = authkey or get_authkey()
+        self.conn = None
+        self._lock = threading.Lock()
+
+    def _call(self, method, *args):
+        with self._lock:
+            # reconnect once if the server was restarted
+            for attempt in range(2):
+                if self.conn is None:
+                    self.conn = Client(self.address, authkey=self.authkey)
+                try:
+                    self.conn.send((method, args))
+                    status, result = self.conn.recv()
+                    break
+                except (EOFError, ConnectionError, OSError):
+                    self.conn = None
+                    if attempt == 1:
+                        raise
+        if status != "ok":
+            raise RuntimeError(f"Skill retrieval server error: {result}")
+        return result
+
+    def retrieve_skills(self, query):
+        return self._call("retrieve_skills", query)
+
+    def retrieve_skills_batch(self, queries):
+        return self._call("retrieve_skills_batch", list(queries))
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve skill retrieval to local agents")
+    parser.add_argument("--address", default="localhost:6000")
+    parser.add_argument("--ckpt_dir", default="ckpt")
+    parser.add_argument("--retrieval_top_k", type=int, default=5)
+    parser.add_argument("--embedding_model", default="openai")
+    parser.add_argument("--vectordb", default="chroma")
+    parser.add_argument("--no_embedding_cache", action="store_true")
+    args = parser.parse_args()
+    SkillRetrievalServer(
+        args.address,
+        ckpt_dir=args.ckpt_dir,
+        retrieval_top_k=args.retrieval_top_k,
+        embedding_model=args.embedding_model,
+        embedding_cache_path=None
+        if args.no_embedding_cache
+        else f"{args.ckpt_dir}/embedding_cache.sqlite3",
+        vectordb=args.vectordb,
+    ).serve_forever()
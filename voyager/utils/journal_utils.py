@@ -0,0 +1,122 @@
+import copy
+import json
+import os
+
+
+class JournalStore:
+    """
+    Append-only journal behind a json state file (a dict or a list).
+    Every change is appended to {path}.journal as one json line and fsynced, so a write costs O(change)
+    and a crash can at most lose the line being written. The journal is periodically compacted into
+    {path}, which keeps the plain json format of the original state files.
+
+    Compaction: write {path}.tmp, rename the journal to {path}.compacting, replace {path} with the tmp file,
+    then delete {path}.compacting. On load, a leftover .compacting file is replayed only if the tmp file
+    still exists, i.e. the snapshot was not replaced yet.
+    """
+
+    def __init__(self, path, default, resume=True, compact_every=1000, fsync=True):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compacting_path = f"{path}.compacting"
+        self.tmp_path = f"{path}.tmp"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.num_entries = 0
+        self._journal = None
+        if resume:
+            self.data = self._load(default)
+        else:
+            self.data = copy.deepcopy(default)
+        # start every session from a compacted snapshot and an empty journal
+        self.compact()
+
+    def _load(self, default):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as fp:
+                data = json.load(fp)
+        else:
+            data = copy.deepcopy(default)
+        if os.path.exists(self.compacting_path):
+            if os.path.exists(self.tmp_path):
+                # crashed before the new snapshot replaced the old one
+                self._replay(data, self.compacting_path)
+            os.remove(self.compacting_path)
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        self._replay(data, self.journal_path)
+        return data
+
+    def _replay(self, data, journal_path):
+        if not os.path.exists(journal_path):
+            return
+        with open(journal_path, "r") as fp:
+            for line in fp:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # torn last line of a crashed write
+                    break
+                self._apply(data, entry)
+
+    @staticmethod
+    def _apply(data, entry):
+        op = entry["op"]
+        if op == "set":
+            data[entry["key"]] = entry["value"]
+        elif op == "update":
+            data.update(entry["value"])
+        elif op == "delete":
+            data.pop(entry["key"], None)
+        elif op == "append":
+            data.append(entry["value"])
+        elif op == "remove":
+            # remove every occurrence
+            data[:] = [value for value in data if value != entry["value"]]
+        else:
+            raise ValueError(f"Unknown journal op {op}")
+
+    def _write(self, entry):
+        self._apply(self.data, entry)
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a")
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self.num_entries += 1
+        if self.compact_every and self.num_entries >= self.compact_every:
+            self.compact()
+
+    def set(self, key, value):
+        self._write({"op": "set", "key": key, "value": value})
+
+    def update(self, values):
+        self._write({"op": "update", "value": values})
+
+    def delete(self, key):
+        self._write({"op": "delete", "key": key})
+
+    def append(self, value):
+        self._write({"op": "append", "value": value})
+
+    def remove(self, value):
+        self._write({"op": "remove", "value": value})
+
+    def compact(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        with open(self.tmp_path, "w") as fp:
+            json.dump(self.data, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        if os.path.exists(self.journal_path):
+            os.replace(self.journal_path, self.compacting_path)
+        os.replace(self.tmp_path, self.path)
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+        self.num_entries = 0
+
+    def close(self):
+        self.compact()
@@ -5,11 +5,22 @@ from .json_utils import *
 
 
 class EventRecorder:
+    """
+    Dumps the events of every iteration to {ckpt_dir}/events and keeps the statistics derived from them.
+
+    Besides the event files, each record appends one line to {ckpt_dir}/events_index.jsonl with what the
+    iteration contributed (new items, biomes, positions, elapsed ticks), and every summary_every records the
+    accumulated statistics are flushed to {ckpt_dir}/events_summary.json together with the index offset they
+    cover. Resume loads the summary and replays only the index lines written after it, the event files
+    themselves are only read to build the index of a checkpoint that predates it.
+    """
+
     def __init__(
         self,
         ckpt_dir="ckpt",
         resume=False,
         init_position=None,
+        summary_every=50,
     ):
         self.ckpt_dir = ckpt_dir
         self.item_history = set()
@@ -20,9 +31,18 @@ class EventRecorder:
         self.position_history = [[0, 0]]
         self.elapsed_time = 0
         self.iteration = 0
+        self.summary_every = summary_every
+        self.index_path = f_join(ckpt_dir, "events_index.jsonl")
+        self.summary_path = f_join(ckpt_dir, "events_summary.json")
+        # byte offset of the end of the last index line
+        self.index_offset = 0
         f_mkdir(self.ckpt_dir, "events")
         if resume:
             self.resume()
+        else:
+            for path in [self.index_path, self.summary_path]:
+                if os.path.exists(path):
+                    os.remove(path)
 
     def record(self, events, task):
         task = re.sub(r'[\\/:"*?<>| ]', "_", task)
@@ -30,27 +50,144 @@ class EventRecorder:
             "_%Y%m%d_%H%M%S", time.localtime()
         )
         self.iteration += 1
-        if not self.init_position:
+        entry = self.replay_events(events, task)
+        print(
+            f"\033[96m****Recorder message: {self.elapsed_time} ticks have elapsed****\033[0m\n"
+            f"\033[96m****Recorder message: {self.iteration} iteration passed****\033[0m"
+        )
+        # index first, a crash before the event file is written then loses nothing resume needs
+        self.append_index([entry])
+        dump_json(events, f_join(self.ckpt_dir, "events", task))
+        if self.iteration % self.summary_every == 0:
+            self.dump_summary()
+
+    def replay_events(self, events, record):
+        """
+        Apply the events of one iteration to the statistics.
+        :return: the index entry of the iteration
+        """
+        entry = {
+            "iteration": self.iteration,
+            "record": record,
+            "init_position": None,
+            "new_items": [],
+            "biomes": [],
+            "positions": [],
+            "elapsed_time": 0,
+        }
+        if events and not self.init_position:
             self.init_position = [
                 events[0][1]["status"]["position"]["x"],
                 events[0][1]["status"]["position"]["z"],
             ]
+            entry["init_position"] = self.init_position
+        num_positions = len(self.position_history)
+        biomes = set()
         for event_type, event in events:
-            self.update_items(event)
+            new_items = self.update_items(event)
+            if new_items:
+                entry["new_items"].append(new_items)
+            biomes.add(event["status"]["biome"])
+            self.update_position(event)
             if event_type == "observe":
+                entry["elapsed_time"] += event["status"]["elapsedTime"]
                 self.update_elapsed_time(event)
-        print(
-            f"\033[96m****Recorder message: {self.elapsed_time} ticks have elapsed****\033[0m\n"
-            f"\033[96m****Recorder message: {self.iteration} iteration passed****\033[0m"
-        )
-        dump_json(events, f_join(self.ckpt_dir, "events", task))
+        entry["biomes"] = sorted(biomes)
+        entry["positions"] = self.position_history[num_positions:]
+        return entry
+
+    def replay_entry(self, entry):
+        self.iteration = entry["iteration"]
+        if entry["init_position"] and not self.init_position:
+            self.init_position = entry["init_position"]
+        for time_key, new_items in entry["new_items"]:
+            self.item_history.update(new_items)
+            self.item_vs_time.setdefault(time_key, []).extend(new_items)
+            self.item_vs_iter.setdefault(self.iteration, []).extend(new_items)
+        self.biome_history.update(entry["biomes"])
+        self.position_history.extend(entry["positions"])
+        self.elapsed_time += entry["elapsed_time"]
+
+    def append_index(self, entries):
+        with open(self.index_path, "a") as fp:
+            for entry in entries:
+                fp.write(json.dumps(entry) + "\n")
+            self.index_offset = fp.tell()
+
+    def dump_summary(self):
+        summary = {
+            "index_offset": self.index_offset,
+            "iteration": self.iteration,
+            "init_position": self.init_position,
+            "item_history": sorted(self.item_history),
+            "item_vs_time": [[k, v] for k, v in self.item_vs_time.items()],
+            "item_vs_iter": [[k, v] for k, v in self.item_vs_iter.items()],
+            "biome_history": sorted(self.biome_history),
+            "position_history": self.position_history,
+            "elapsed_time": self.elapsed_time,
+        }
+        tmp_path = f"{self.summary_path}.tmp"
+        dump_json(summary, tmp_path)
+        os.replace(tmp_path, self.summary_path)
+
+    def load_summary(self):
+        summary = load_json(self.summary_path)
+        self.index_offset = summary["index_offset"]
+        self.iteration = summary["iteration"]
+        self.init_position = summary["init_position"] or self.init_position
+        self.item_history = set(summary["item_history"])
+        self.item_vs_time = {k: v for k, v in summary["item_vs_time"]}
+        self.item_vs_iter = {k: v for k, v in summary["item_vs_iter"]}
+        self.biome_history = set(summary["biome_history"])
+        self.position_history = summary["position_history"]
+        self.elapsed_time = summary["elapsed_time"]
 
     def resume(self, cutoff=None):
+        """
+        :param cutoff: only replay the first cutoff iterations
+        """
+        if not os.path.exists(self.index_path):
+            self.reset_statistics()
+            self.build_index()
+        # build_index replayed every event file, start over from the index
+        self.reset_statistics()
+        summary_usable = os.path.exists(self.summary_path) and (
+            cutoff is None or load_json(self.summary_path)["iteration"] <= cutoff
+        )
+        if summary_usable:
+            self.load_summary()
+        with open(self.index_path, "r+") as fp:
+            fp.seek(self.index_offset)
+            while True:
+                line = fp.readline()
+                if not line:
+                    break
+                if not line.endswith("\n"):
+                    # torn line of a crashed write, drop it so that the next record starts a new line
+                    fp.truncate(self.index_offset)
+                    break
+                entry = json.loads(line)
+                if cutoff and entry["iteration"] > cutoff:
+                    break
+                self.replay_entry(entry)
+                self.index_offset = fp.tell()
+        if not cutoff:
+            self.dump_summary()
+
+    def reset_statistics(self):
         self.item_history = set()
         self.item_vs_time = {}
         self.item_vs_iter = {}
+        self.biome_history = set()
         self.elapsed_time = 0
         self.position_history = [[0, 0]]
+        self.iteration = 0
+        self.index_offset = 0
+
+    def build_index(self):
+        """
+        Replay the event files of a checkpoint written without an index and index them.
+        """
 
         def get_timestamp(string):
             timestamp = "_".join(string.split("_")[-2:])
@@ -58,23 +195,22 @@ class EventRecorder:
 
         records = f_listdir(self.ckpt_dir, "events")
         sorted_records = sorted(records, key=get_timestamp)
+        if records:
+            print(
+                f"\033[96m****Recorder message: indexing {len(records)} event files****\033[0m"
+            )
+        entries = []
         for record in sorted_records:
             self.iteration += 1
-            if cutoff and self.iteration > cutoff:
-                break
             events = load_json(f_join(self.ckpt_dir, "events", record))
-            if not self.init_position:
-                self.init_position = (
-                    events[0][1]["status"]["position"]["x"],
-                    events[0][1]["status"]["position"]["z"],
-                )
-            for event_type, event in events:
-                self.update_items(event)
-                self.update_position(event)
-                if event_type == "observe":
-                    self.update_elapsed_time(event)
+            entries.append(self.replay_events(events, record))
+        self.append_index(entries)
+        self.dump_summary()
 
     def update_items(self, event):
+        """
+        :return: [elapsed time, new items] if the event has items never seen before
+        """
         inventory = event["inventory"]
         elapsed_time = event["status"]["elapsedTime"]
         biome = event["status"]["biome"]
@@ -89,6 +225,8 @@ class EventRecorder:
             if self.iteration not in self.item_vs_iter:
                 self.item_vs_iter[self.iteration] = []
             self.item_vs_iter[self.iteration].extend(new_items)
+            return [self.elapsed_time + elapsed_time, list(new_items)]
+        return None
 
     def update_elapsed_time(self, event):
         self.elapsed_time += event["status"]["elapsedTime"]
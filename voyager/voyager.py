@@ -1,11 +1,12 @@
-import copy
+import asyncio
 import json
 import os
 import time
-from typing import Dict
+from typing import Dict, List
 
 import voyager.utils as U
-from .env import VoyagerEnv
+from .env import VoyagerEnv, AsyncVoyagerEnv, RepeatedMessageAbort
+from .llm import get_llm_cache, CircuitOpenError
 
 from .agents import ActionAgent
 from .agents import CriticAgent
@@ -24,6 +25,13 @@ class Voyager:
         openai_api_key: str = None,
         env_wait_ticks: int = 20,
         env_request_timeout: int = 600,
+        env_pool_maxsize: int = 4,
+        env_request_max_retries: int = 3,
+        env_async: bool = False,
+        env_wire_encoding: str = None,
+        env_delta_observations: bool = False,
+        env_abort_repeats: int = None,
+        env_step_tick_budget: int = None,
         max_iterations: int = 300,
         reset_placed_if_failed: bool = False,
         action_agent_model_name: str = "gpt-5-mini-2025-08-07",
@@ -31,6 +39,12 @@ class Voyager:
         action_agent_task_max_retries: int = 4,
         action_agent_show_chat_log: bool = True,
         action_agent_show_execution_error: bool = True,
+        action_agent_skill_token_budget: int = None,
+        action_agent_parser_workers: int = 1,
+        action_agent_fast_parse: bool = True,
+        action_agent_chest_radius: float = None,
+        action_agent_chest_max_rendered: int = None,
+        action_agent_chest_memory_size: int = None,
         curriculum_agent_model_name: str = "gpt-4",
         curriculum_agent_temperature: float = 0,
         curriculum_agent_qa_model_name: str = "gpt-3.5-turbo",
@@ -42,10 +56,18 @@ class Voyager:
         critic_agent_model_name: str = "gpt-4",
         critic_agent_temperature: float = 1,
         critic_agent_mode: str = "auto",
+        critic_agent_rule_check: bool = True,
         skill_manager_model_name: str = "gpt-5-mini-2025-08-07",
         skill_manager_temperature: float = 0,
         skill_manager_retrieval_top_k: int = 5,
+        skill_manager_vectordb: str = "chroma",
+        skill_retrieval_address: str = None,
         openai_api_request_timeout: int = 240,
+        embedding_model: str = "openai",
+        embedding_cache: bool = True,
+        llm_cache_agents: List[str] = None,
+        llm_cache_ttl: float = None,
+        llm_cache_max_entries: int = 100000,
         ckpt_dir: str = "ckpt",
         skill_library_dir: str = None,
         resume: bool = False,
@@ -64,10 +86,33 @@ class Voyager:
         you should increase this value
         :param env_request_timeout: how many seconds to wait for each step, if the code execution exceeds this time,
         python side will terminate the connection and need to be resumed
+        :param env_pool_maxsize: how many keep-alive connections to the mineflayer server are pooled
+        :param env_request_max_retries: how many times a request is retried if the connection to mineflayer fails,
+        with exponential backoff between attempts
+        :param env_async: use AsyncVoyagerEnv, the agent must then be driven with the awaitable
+        areset / astep / arollout instead of reset / step / rollout
+        :param env_wire_encoding: encoding of the observations sent by mineflayer, "json" or "msgpack",
+        None to use msgpack when both the python and node packages are installed
+        :param env_delta_observations: have mineflayer send only the observation fields that changed since
+        the previous step, the complete events are rebuilt on the python side
+        :param env_abort_repeats: stream the events of each step and abort the program once this many
+        "I cannot make ..." / "No ... nearby" messages were seen, None to always wait for the program to end
+        :param env_step_tick_budget: cancel the program of a step once it ran for this many ticks,
+        None to only rely on env_request_timeout
         :param reset_placed_if_failed: whether to reset placed blocks if failed, useful for building task
         :param action_agent_model_name: action agent model name
         :param action_agent_temperature: action agent temperature
         :param action_agent_task_max_retries: how many times to retry if failed
+        :param action_agent_skill_token_budget: max tokens of retrieved skills in the action prompt,
+        skills are kept in retrieval order until the budget is spent, None to keep all of them
+        :param action_agent_parser_workers: how many node Babel parser workers the process shares for parsing
+        action responses, 0 to parse through the javascript bridge
+        :param action_agent_fast_parse: extract plain function declarations from action responses in Python,
+        Babel is only used for the responses it cannot decide
+        :param action_agent_chest_radius: only chests within this many blocks of the bot are shown in the
+        action, critic and curriculum prompts, None to show every remembered chest
+        :param action_agent_chest_max_rendered: show at most this many chests, the nearest ones
+        :param action_agent_chest_memory_size: remember at most this many chests, the farthest ones are evicted
         :param curriculum_agent_model_name: curriculum agent model name
         :param curriculum_agent_temperature: curriculum agent temperature
         :param curriculum_agent_qa_model_name: curriculum agent qa model name
@@ -93,10 +138,26 @@ class Voyager:
         :param critic_agent_model_name: critic agent model name
         :param critic_agent_temperature: critic agent temperature
         :param critic_agent_mode: "auto" for automatic critic ,"manual" for human critic
+        :param critic_agent_rule_check: decide mine / craft / smelt / collect tasks from the inventory
+        without calling the LLM when the outcome is certain
         :param skill_manager_model_name: skill manager model name
         :param skill_manager_temperature: skill manager temperature
         :param skill_manager_retrieval_top_k: how many skills to retrieve for each task
+        :param skill_manager_vectordb: "chroma", or "numpy" for a single memory-mapped skill/vectordb.npy
+        next to skills.json (convert existing libraries with python -m voyager.retrieval.migrate)
+        :param skill_retrieval_address: "host:port" or unix socket of a shared skill retrieval server
+        (python -m voyager.retrieval.service), None to load the skill index in this process
         :param openai_api_request_timeout: how many seconds to wait for openai api
+        :param embedding_model: embedding backend of the skill and qa vectordbs, "openai", "hashing" (local, offline)
+        or "sentence_transformers[:<model name>]", vectordbs built with another backend must be rebuilt
+        :param embedding_cache: cache embeddings by (model, text hash) in {ckpt_dir}/embedding_cache.sqlite3,
+        shared by every vectordb and every agent process using the same ckpt dir
+        :param llm_cache_agents: agents whose LLM completions are cached in {ckpt_dir}/llm_cache.sqlite3
+        and reused for identical requests, any of "critic", "curriculum", None to disable,
+        only agents running at temperature 0 are cached. The skill manager model only accepts its default
+        temperature and is never cached
+        :param llm_cache_ttl: seconds a cached completion stays valid, None to keep it until evicted
+        :param llm_cache_max_entries: least recently used completions are evicted above this size
         :param ckpt_dir: checkpoint dir
         :param skill_library_dir: skill library dir
         :param resume: whether to resume from checkpoint
@@ -105,17 +166,43 @@ class Voyager:
         self.current_status = "Idle"
         # init env
         print("🚀 VoyagerENV Başlatılıyor...")
-        self.env = VoyagerEnv(
+        env_cls = AsyncVoyagerEnv if env_async else VoyagerEnv
+        self.env = env_cls(
             mc_port=mc_port,
             azure_login=azure_login,
             server_port=server_port,
             request_timeout=env_request_timeout,
+            pool_maxsize=env_pool_maxsize,
+            max_retries=env_request_max_retries,
+            wire_encoding=env_wire_encoding,
+            delta_observations=env_delta_observations,
+            step_tick_budget=env_step_tick_budget,
             bot_name=self.bot_name,
             log_path=f"./logs/{self.bot_name}",
         )
         print("🚀 VoyagerENV Başlatıldı.")
 
         self.env_wait_ticks = env_wait_ticks
+        self.step_abort_policy = (
+            RepeatedMessageAbort(max_repeats=env_abort_repeats)
+            if env_abort_repeats
+            else None
+        )
+        embedding_cache_path = (
+            f"{ckpt_dir}/embedding_cache.sqlite3" if embedding_cache else None
+        )
+        llm_cache_agents = llm_cache_agents or []
+        for agent in llm_cache_agents:
+            assert agent in ["critic", "curriculum"], f"llm cache agent {agent} not supported"
+        self.llm_cache = (
+            get_llm_cache(
+                f"{ckpt_dir}/llm_cache.sqlite3",
+                ttl=llm_cache_ttl,
+                max_entries=llm_cache_max_entries,
+            )
+            if llm_cache_agents
+            else None
+        )
         self.reset_placed_if_failed = reset_placed_if_failed
         self.max_iterations = max_iterations
 
@@ -131,6 +218,12 @@ class Voyager:
                 resume=resume,
                 chat_log=action_agent_show_chat_log,
                 execution_error=action_agent_show_execution_error,
+                skill_token_budget=action_agent_skill_token_budget,
+                parser_workers=action_agent_parser_workers,
+                fast_parse=action_agent_fast_parse,
+                chest_radius=action_agent_chest_radius,
+                chest_max_rendered=action_agent_chest_max_rendered,
+                chest_memory_size=action_agent_chest_memory_size,
             )
         except Exception as e:
             print(f"❌ [{self.bot_name}] Action Agent Başlatma Hatası: {e}", flush=True)
@@ -149,6 +242,9 @@ class Voyager:
         #         mode=curriculum_agent_mode,
         #         warm_up=curriculum_agent_warm_up,
         #         core_inventory_items=curriculum_agent_core_inventory_items,
+        #         embedding_model=embedding_model,
+        #         embedding_cache_path=embedding_cache_path,
+        #         llm_cache=self.llm_cache if "curriculum" in llm_cache_agents else None,
         #     )
         # except Exception as e:
         #     print(f"❌ [{self.bot_name}] Curriculum Agent Başlatma Hatası: {e}", flush=True)
@@ -159,6 +255,8 @@ class Voyager:
                 temperature=critic_agent_temperature,
                 request_timout=openai_api_request_timeout,
                 mode=critic_agent_mode,
+                rule_check=critic_agent_rule_check,
+                llm_cache=self.llm_cache if "critic" in llm_cache_agents else None,
             )
         except Exception as e:
             print(f"❌ [{self.bot_name}] Critic Agent Başlatma Hatası: {e}", flush=True)
@@ -169,9 +267,13 @@ class Voyager:
                 model_name=skill_manager_model_name,
                 temperature=skill_manager_temperature,
                 retrieval_top_k=skill_manager_retrieval_top_k,
+                vectordb=skill_manager_vectordb,
+                retrieval_address=skill_retrieval_address,
                 request_timout=openai_api_request_timeout,
                 ckpt_dir=skill_library_dir if skill_library_dir else ckpt_dir,
                 resume=True if resume or skill_library_dir else False,
+                embedding_model=embedding_model,
+                embedding_cache_path=embedding_cache_path,
             )
         except Exception as e:
             print(f"❌ [{self.bot_name}] Skill Manager Başlatma Hatası: {e}", flush=True)
@@ -190,37 +292,49 @@ class Voyager:
         self.messages = None
         self.conversations = []
         self.last_events = None
+        # inventory before the current step, the critic rules compare against it
+        self.last_inventory = None
         ### Added for Multi-Agent Global Planner ###
         self.last_task = None
         self.last_success = None
         self.last_critique = ""
 
     def reset(self, task, context="", reset_env=True):
+        self._begin_reset(task, context)
+        if reset_env:
+            self.env.reset(options=self._soft_reset_options())
+        # step to peek an observation
+        events = self.env.step(self._peek_code())
+        skills = self.skill_manager.retrieve_skills(query=self.context)
+        return self._end_reset(events, skills)
+
+    def _begin_reset(self, task, context):
         self.action_agent_rollout_num_iter = 0
         self.task = task
         self.context = context
-        if reset_env:
-            self.env.reset(
-                options={
-                    "mode": "soft",
-                    "wait_ticks": self.env_wait_ticks,
-                }
-            )
+
+    def _soft_reset_options(self):
+        return {
+            "mode": "soft",
+            "wait_ticks": self.env_wait_ticks,
+        }
+
+    def _peek_code(self):
         difficulty = (
             # "easy" if len(self.curriculum_agent.completed_tasks) > 15 else "peaceful"
         )
-        # step to peek an observation
-        events = self.env.step(
+        return (
             "bot.chat(`/time set ${getNextTime()}`);\n"
             + f"bot.chat('/difficulty {difficulty}');"
         )
-        skills = self.skill_manager.retrieve_skills(query=self.context)
+
+    def _end_reset(self, events, skills):
         print(
             f"\033[33mRender Action Agent system message with {len(skills)} skills\033[0m"
         )
         system_message = self.action_agent.render_system_message(skills=skills)
         human_message = self.action_agent.render_human_message(
-            events=events, code="", task=self.task, context=context, critique=""
+            events=events, code="", task=self.task, context=self.context, critique=""
         )
         self.messages = [system_message, human_message]
         print(
@@ -228,6 +342,7 @@ class Voyager:
         )
         assert len(self.messages) == 2
         self.conversations = []
+        self.last_inventory = events[-1][1]["inventory"]
         return self.messages
 
     def close(self):
@@ -236,73 +351,112 @@ class Voyager:
     def step(self):
         if self.action_agent_rollout_num_iter < 0:
             raise ValueError("Agent must be reset before stepping")
-        ai_message = self.action_agent.llm(self.messages)
-        print(f"\033[34m****Action Agent ai message****\n{ai_message.content}\033[0m")
-        self.conversations.append(
-            (self.messages[0].content, self.messages[1].content, ai_message.content)
-        )
-        print(f"[STEP] ITER={self.action_agent_rollout_num_iter}", flush=True)
-        parsed_result = self.action_agent.process_ai_message(message=ai_message)
-        print(f"[STEP] AI MESSAGE ALINDI, uzunluk={len(ai_message.content)}", flush=True)
+        try:
+            ai_message = self.action_agent.retry_executor.run(
+                self.action_agent.llm, self.messages
+            )
+        except CircuitOpenError as e:
+            # the model is failing, give up this iteration instead of the whole rollout
+            parsed_result = f"Action Agent LLM is unavailable: {e}."
+        else:
+            parsed_result = self._process_ai_message(ai_message)
         success = False
         if isinstance(parsed_result, dict):
             print("[STEP] parsed_result bir dict, kod çalıştırılacak.", flush=True)
             code = parsed_result["program_code"] + "\n" + parsed_result["exec_code"]
             events = self.env.step(
                 code,
-                programs=self.skill_manager.programs,
-            )
-            print(f"[STEP] env.step döndü, event_sayısı={len(events)}", flush=True)
-            self.recorder.record(events, self.task)
-            self.action_agent.update_chest_memory(events[-1][1]["nearbyChests"])
-            success, critique = self.critic_agent.check_task_success(
-                events=events,
-                task=self.task,
-                context=self.context,
-                chest_observation=self.action_agent.render_chest_observation(),
-                max_retries=5,
+                programs=self.skill_manager.program_list,
+                abort_policy=self.step_abort_policy,
             )
-            print(f"[STEP] Critic sonucu: success={success} | critique={critique!r}", flush=True)
-            ### Added for Multi-Agent Global Planner ###
-            self.last_task = self.task
-            self.last_success = success
-            self.last_critique = critique
-            ####
+            success, critique = self._check_task_success(events)
             if self.reset_placed_if_failed and not success:
-                # revert all the placing event in the last step
-                blocks = []
-                positions = []
-                for event_type, event in events:
-                    if event_type == "onSave" and event["onSave"].endswith("_placed"):
-                        block = event["onSave"].split("_placed")[0]
-                        position = event["status"]["position"]
-                        blocks.append(block)
-                        positions.append(position)
                 new_events = self.env.step(
-                    f"await givePlacedItemBack(bot, {U.json_dumps(blocks)}, {U.json_dumps(positions)})",
-                    programs=self.skill_manager.programs,
+                    self._give_placed_item_back_code(events),
+                    programs=self.skill_manager.program_list,
                 )
-                events[-1][1]["inventory"] = new_events[-1][1]["inventory"]
-                events[-1][1]["voxels"] = new_events[-1][1]["voxels"]
+                self._restore_placed_items(events, new_events)
             new_skills = self.skill_manager.retrieve_skills(
-                query=self.context
-                + "\n\n"
-                + self.action_agent.summarize_chatlog(events)
+                query=self._retrieval_query(events)
             )
-            system_message = self.action_agent.render_system_message(skills=new_skills)
-            human_message = self.action_agent.render_human_message(
-                events=events,
-                code=parsed_result["program_code"],
-                task=self.task,
-                context=self.context,
-                critique=critique,
-            )
-            self.last_events = copy.deepcopy(events)
-            self.messages = [system_message, human_message]
+            self._update_messages(events, parsed_result, critique, new_skills)
         else:
-            assert isinstance(parsed_result, str)
-            self.recorder.record([], self.task)
-            print(f"\033[34m{parsed_result} Trying again!\033[0m")
+            self._record_parse_failure(parsed_result)
+        return self._end_step(parsed_result, success)
+
+    def _process_ai_message(self, ai_message):
+        print(f"\033[34m****Action Agent ai message****\n{ai_message.content}\033[0m")
+        self.conversations.append(
+            (self.messages[0].content, self.messages[1].content, ai_message.content)
+        )
+        print(f"[STEP] ITER={self.action_agent_rollout_num_iter}", flush=True)
+        parsed_result = self.action_agent.process_ai_message(message=ai_message)
+        print(f"[STEP] AI MESSAGE ALINDI, uzunluk={len(ai_message.content)}", flush=True)
+        return parsed_result
+
+    def _check_task_success(self, events):
+        print(f"[STEP] env.step döndü, event_sayısı={len(events)}", flush=True)
+        self.recorder.record(events, self.task)
+        self.action_agent.update_chest_memory(
+            events[-1][1]["nearbyChests"], events[-1][1]["status"]["position"]
+        )
+        success, critique = self.critic_agent.check_task_success(
+            events=events,
+            task=self.task,
+            context=self.context,
+            chest_observation=self.action_agent.render_chest_observation(
+                events[-1][1]["status"]["position"]
+            ),
+            max_retries=5,
+            initial_inventory=self.last_inventory,
+        )
+        print(f"[STEP] Critic sonucu: success={success} | critique={critique!r}", flush=True)
+        ### Added for Multi-Agent Global Planner ###
+        self.last_task = self.task
+        self.last_success = success
+        self.last_critique = critique
+        ####
+        return success, critique
+
+    def _give_placed_item_back_code(self, events):
+        # revert all the placing event in the last step
+        blocks = []
+        positions = []
+        for event_type, event in events:
+            if event_type == "onSave" and event["onSave"].endswith("_placed"):
+                block = event["onSave"].split("_placed")[0]
+                position = event["status"]["position"]
+                blocks.append(block)
+                positions.append(position)
+        return f"await givePlacedItemBack(bot, {U.json_dumps(blocks)}, {U.json_dumps(positions)})"
+
+    def _restore_placed_items(self, events, new_events):
+        events[-1][1]["inventory"] = new_events[-1][1]["inventory"]
+        events[-1][1]["voxels"] = new_events[-1][1]["voxels"]
+
+    def _retrieval_query(self, events):
+        return self.context + "\n\n" + self.action_agent.summarize_chatlog(events)
+
+    def _update_messages(self, events, parsed_result, critique, skills):
+        system_message = self.action_agent.render_system_message(skills=skills)
+        human_message = self.action_agent.render_human_message(
+            events=events,
+            code=parsed_result["program_code"],
+            task=self.task,
+            context=self.context,
+            critique=critique,
+        )
+        # events are read only below the event dicts, unchanged delta observation fields are shared
+        self.last_events = [[event_type, dict(event)] for event_type, event in events]
+        self.last_inventory = events[-1][1]["inventory"]
+        self.messages = [system_message, human_message]
+
+    def _record_parse_failure(self, parsed_result):
+        assert isinstance(parsed_result, str)
+        self.recorder.record([], self.task)
+        print(f"\033[34m{parsed_result} Trying again!\033[0m")
+
+    def _end_step(self, parsed_result, success):
         assert len(self.messages) == 2
         self.action_agent_rollout_num_iter += 1
         done = (
@@ -357,6 +511,84 @@ class Voyager:
         finally:
             self.current_status = "Idle"
 
+    # ---------------- asyncio rollout -----------------
+    # Used with env_async=True. Env requests and the action agent LLM call are awaited natively,
+    # the remaining blocking work (babel parsing, critic, skill retrieval) runs in worker threads
+    # so that other bots on the same event loop keep running.
+
+    async def areset(self, task, context="", reset_env=True):
+        self._begin_reset(task, context)
+        if reset_env:
+            await self.env.reset(options=self._soft_reset_options())
+        events = await self.env.step(self._peek_code())
+        skills = await asyncio.to_thread(
+            self.skill_manager.retrieve_skills, query=self.context
+        )
+        return self._end_reset(events, skills)
+
+    @property
+    def llm_retry_stats(self):
+        return {
+            "action": self.action_agent.retry_executor.metrics,
+            "critic": self.critic_agent.retry_executor.metrics,
+            "skill": self.skill_manager.retry_executor.metrics,
+        }
+
+    async def aclose(self):
+        await self.env.close()
+
+    async def astep(self):
+        if self.action_agent_rollout_num_iter < 0:
+            raise ValueError("Agent must be reset before stepping")
+        try:
+            ai_message = await self.action_agent.retry_executor.arun(
+                self.action_agent.llm, self.messages
+            )
+        except CircuitOpenError as e:
+            parsed_result = f"Action Agent LLM is unavailable: {e}."
+        else:
+            parsed_result = await asyncio.to_thread(
+                self._process_ai_message, ai_message
+            )
+        success = False
+        if isinstance(parsed_result, dict):
+            code = parsed_result["program_code"] + "\n" + parsed_result["exec_code"]
+            events = await self.env.step(
+                code,
+                programs=self.skill_manager.program_list,
+                abort_policy=self.step_abort_policy,
+            )
+            success, critique = await asyncio.to_thread(
+                self._check_task_success, events
+            )
+            if self.reset_placed_if_failed and not success:
+                new_events = await self.env.step(
+                    self._give_placed_item_back_code(events),
+                    programs=self.skill_manager.program_list,
+                )
+                self._restore_placed_items(events, new_events)
+            new_skills = await asyncio.to_thread(
+                self.skill_manager.retrieve_skills,
+                query=self._retrieval_query(events),
+            )
+            self._update_messages(events, parsed_result, critique, new_skills)
+        else:
+            self._record_parse_failure(parsed_result)
+        return self._end_step(parsed_result, success)
+
+    async def arollout(self, *, task, context, reset_env=True):
+        print(f"[ROLL OUT] task={task!r} | context={context!r}", flush=True)
+        await self.areset(task=task, context=context, reset_env=reset_env)
+
+        self.current_status = "Working"
+        try:
+            while True:
+                messages, reward, done, info = await self.astep()
+                if done:
+                    break
+            return messages, reward, done, info
+        finally:
+            self.current_status = "Idle"
 
     def learn(self, reset_env=True):
         if self.resume:
@@ -382,11 +614,18 @@ class Voyager:
             if self.recorder.iteration > self.max_iterations:
                 print("Iteration limit reached")
                 break
-            task, context = self.curriculum_agent.propose_next_task(
-                events=self.last_events,
-                chest_observation=self.action_agent.render_chest_observation(),
-                max_retries=5,
-            )
+            try:
+                task, context = self.curriculum_agent.propose_next_task(
+                    events=self.last_events,
+                    chest_observation=self.action_agent.render_chest_observation(
+                        self.last_events[-1][1]["status"]["position"]
+                    ),
+                    max_retries=5,
+                )
+            except CircuitOpenError as e:
+                print(f"\033[31mCould not propose the next task: {e}\033[0m")
+                time.sleep(5)
+                continue
             print(
                 f"\033[35mStarting task {task} for at most {self.action_agent_task_max_retries} times\033[0m"
             )
@@ -417,7 +656,10 @@ class Voyager:
                 print(f"\033[41m{e}\033[0m")
 
             if info["success"]:
-                self.skill_manager.add_new_skill(info)
+                try:
+                    self.skill_manager.add_new_skill(info)
+                except CircuitOpenError as e:
+                    print(f"\033[31mCould not add the new skill: {e}\033[0m")
 
             self.curriculum_agent.update_exploration_progress(info)
             print(
@@ -454,8 +696,7 @@ class Voyager:
                 "wait_ticks": self.env_wait_ticks,
             }
         )
-        self.curriculum_agent.completed_tasks = []
-        self.curriculum_agent.failed_tasks = []
+        self.curriculum_agent.reset_tasks()
         self.last_events = self.env.step("")
         while self.curriculum_agent.progress < len(sub_goals):
             next_task = sub_goals[self.curriculum_agent.progress]
@@ -481,11 +722,29 @@ class Voyager:
             Returns a status report for the Multi-Agent Global Planner.
             Fix: Uses recursive search to locate the data.
             """
+            if self.last_events is None:
+                if isinstance(self.env, AsyncVoyagerEnv):
+                    raise RuntimeError(
+                        "get_agent_state cannot observe through an async env, await aget_agent_state instead"
+                    )
+                try:
+                    self.last_events = self.env.step("")
+                except Exception as e:
+                    return {"agent_name": self.bot_name, "status": "Error", "error": str(e)}
+            return self._agent_state()
+
+    async def aget_agent_state(self):
+            """
+            asyncio counterpart of get_agent_state.
+            """
             if self.last_events is None:
                 try:
-                    self.last_events = self.env.step("") 
+                    self.last_events = await self.env.step("")
                 except Exception as e:
                     return {"agent_name": self.bot_name, "status": "Error", "error": str(e)}
+            return self._agent_state()
+
+    def _agent_state(self):
             observe_payload = None
             for event_type, event in reversed(self.last_events):
                 if event_type == "observe":